@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import type { ComparisonResult } from '../types/domain';
-import { API_BASE_PATH } from '../utils/constants';
+import { API_BASE_PATH, DEGRADED_NOTICES } from '../utils/constants';
 
 interface PDFViewerProps {
   result: ComparisonResult;
@@ -12,11 +12,13 @@ export function PDFViewer({ result, jobId }: PDFViewerProps) {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [showDifferences, setShowDifferences] = useState(true);
+  const degraded = result.degraded ?? [];
+  const renderSkipped = degraded.includes('render_skipped');
 
   // Load result image
   useEffect(() => {
     const loadResultImage = async () => {
-      if (!jobId) {
+      if (!jobId || renderSkipped) {
         setLoading(false);
         return;
       }
@@ -36,7 +38,7 @@ export function PDFViewer({ result, jobId }: PDFViewerProps) {
     };
 
     loadResultImage();
-  }, [jobId]);
+  }, [jobId, renderSkipped]);
 
   if (loading) {
     return (
@@ -59,7 +61,14 @@ export function PDFViewer({ result, jobId }: PDFViewerProps) {
   if (!resultImageUrl) {
     return (
       <div className="flex items-center justify-center h-screen bg-neutral-900 text-white">
-        <p>Result image not available</p>
+        <div className="text-center max-w-md">
+          <p>Result image not available</p>
+          {renderSkipped && (
+            <p className="mt-2 text-sm text-neutral-400">
+              {DEGRADED_NOTICES.render_skipped} {result.changesCount ?? result.totalDifferences} differences were found.
+            </p>
+          )}
+        </div>
       </div>
     );
   }
@@ -84,6 +93,14 @@ export function PDFViewer({ result, jobId }: PDFViewerProps) {
         </div>
       </header>
 
+      {degraded.length > 0 && (
+        <div className="flex-shrink-0 border-b border-yellow-700 bg-yellow-900/40 px-6 py-2 text-sm text-yellow-200">
+          {degraded.map((item) => (
+            <p key={item}>{DEGRADED_NOTICES[item] ?? item}</p>
+          ))}
+        </div>
+      )}
+
       {/* Main: Result Image */}
       <div className="flex-1 flex flex-col overflow-hidden">
         <div className="flex-1 overflow-auto">
@@ -1,13 +1,13 @@
 /**
  * Job Context
- * Manages comparison job lifecycle and polling
+ * Manages comparison job lifecycle and live status updates
  */
 
 import React, { createContext, useReducer, ReactNode, useCallback } from 'react';
 import type { ComparisonJob, ComparisonResult } from '../types/domain';
 import type { ComparisonJobStatusResponse } from '../types/api';
 import { getJobStatus } from '../services/api';
-import { startPolling, stopPolling } from '../services/pollingService';
+import { watchJob, stopWatching } from '../services/jobEvents';
 import { saveLastJobId } from '../utils/storage';
 
 interface JobContextType {
@@ -114,7 +114,7 @@ export function JobProvider({ children }: { children: ReactNode }) {
   const startJobPolling = useCallback((jobId: string) => {
     dispatch({ type: 'START_POLLING' });
 
-    startPolling(jobId, {
+    watchJob(jobId, {
       onStatusUpdate: (status: ComparisonJobStatusResponse) => {
         const job: ComparisonJob = {
           id: status.job_id,
@@ -122,6 +122,8 @@ export function JobProvider({ children }: { children: ReactNode }) {
           createdAt: new Date(status.created_at),
           updatedAt: new Date(status.updated_at),
           errorMessage: status.error_message,
+          stage: status.stage,
+          progress: status.progress,
         };
 
         dispatch({ type: 'SET_JOB', payload: job });
@@ -134,6 +136,7 @@ export function JobProvider({ children }: { children: ReactNode }) {
             pagesAffected: status.result.pages_affected,
             pages: [],
             generatedAt: new Date(status.result.generated_at),
+            degraded: status.result.degraded ?? status.degraded,
           };
           dispatch({ type: 'SET_RESULT', payload: result });
         }
@@ -148,7 +151,7 @@ export function JobProvider({ children }: { children: ReactNode }) {
   }, []);
 
   const stopCurrentPolling = () => {
-    stopPolling();
+    stopWatching();
     dispatch({ type: 'STOP_POLLING' });
   };
 
@@ -177,6 +180,7 @@ export function JobProvider({ children }: { children: ReactNode }) {
           pagesAffected: status.result.pages_affected,
           pages: [],
           generatedAt: new Date(status.result.generated_at),
+          degraded: status.result.degraded ?? status.degraded,
         };
         dispatch({ type: 'SET_RESULT', payload: result });
       } else if (status.status === 'pending' || status.status === 'processing') {
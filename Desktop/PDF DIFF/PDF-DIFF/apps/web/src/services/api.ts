@@ -15,4 +15,7 @@ export async function getJobStatus(jobId: string): Promise<ComparisonJobStatusRe
   const response = await apiClient.get<ComparisonJobStatusResponse>(`/jobs/${jobId}`);
   return response.data;
 }
+export async function cancelJob(jobId: string): Promise<void> {
+  await apiClient.delete(`/jobs/${jobId}`);
+}
 export default apiClient;
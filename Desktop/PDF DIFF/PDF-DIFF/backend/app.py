@@ -1,15 +1,19 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse, Response
 import uuid
 from datetime import datetime
-import os
-import shutil
 from pathlib import Path
 import logging
+import json
+import re
 
-# Import pdf-diff1 engine
-from pdf_diff_engine import compute_changes, render_changes
+import anyio
+
+from services.job_store import job_store, TERMINAL_STATUSES
+from services.comparison_service import comparison_service
+from services.storage_service import storage_service, ObjectNotFound
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,14 +30,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Needed by PDF.js to issue range requests cross-origin
+    expose_headers=["Accept-Ranges", "Content-Range", "Content-Length", "ETag"],
 )
 
-# Setup file storage
-UPLOAD_DIR = Path("/tmp/pdf_uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+# Handlers that touch the job store (Redis) or storage (S3) are plain `def`
+# so FastAPI runs them in its threadpool instead of blocking the event loop.
+
+# Job artifacts never change once written, so they can be cached forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
-# In-memory storage for demo
-jobs = {}
 
 @app.get("/health")
 async def health_check():
@@ -44,8 +50,9 @@ async def root():
     return {"message": "PDF Comparison API v1.0.0"}
 
 @app.get("/api/v1/jobs")
-async def list_jobs():
+def list_jobs():
     """List all available jobs"""
+    jobs = job_store.list()
     return {
         "jobs": [
             {
@@ -56,7 +63,7 @@ async def list_jobs():
                 "file1_name": j["file1_name"],
                 "file2_name": j["file2_name"],
             }
-            for j in jobs.values()
+            for j in jobs
         ],
         "total": len(jobs)
     }
@@ -76,104 +83,70 @@ async def get_worker():
     )
 
 @app.post("/api/v1/upload")
-async def upload_pdfs(file1: UploadFile = File(...), file2: UploadFile = File(...)):
+def upload_pdfs(file1: UploadFile = File(...), file2: UploadFile = File(...)):
     """Upload two PDF files for comparison using pdf-diff1"""
     job_id = str(uuid.uuid4())
-    job_dir = UPLOAD_DIR / job_id
-    job_dir.mkdir(parents=True, exist_ok=True)
+    file1_key = f"{job_id}/file1.pdf"
+    file2_key = f"{job_id}/file2.pdf"
 
     try:
-        # Save file1
-        file1_path = job_dir / "file1.pdf"
-        with open(file1_path, "wb") as buffer:
-            shutil.copyfileobj(file1.file, buffer)
-
-        # Save file2
-        file2_path = job_dir / "file2.pdf"
-        with open(file2_path, "wb") as buffer:
-            shutil.copyfileobj(file2.file, buffer)
+        # Stream both files into object storage
+        file1_info = storage_service.put(file1_key, file1.file)
+        file2_info = storage_service.put(file2_key, file2.file)
 
         logger.info(f"✓ Job {job_id}: Files uploaded")
 
-        # Compute changes using pdf-diff1
-        try:
-            changes = compute_changes(
-                str(file1_path),
-                str(file2_path),
-                top_margin=0,
-                bottom_margin=100
-            )
-
-            logger.info(f"✓ Job {job_id}: Changes computed ({len(changes)} boxes)")
-
-            # Render changes as image (side-by-side with red boxes)
-            styles = ["box", "box"]  # box style for both PDFs
-            result_image = render_changes(changes, styles, width=900)
-
-            # Save result image
-            result_path = job_dir / "result.png"
-            result_image.save(result_path, "PNG")
-
-            logger.info(f"✓ Job {job_id}: Result image rendered and saved")
-
-            # Create job record
-            changes_count = len([c for c in changes if c != "*"])
-            jobs[job_id] = {
-                "job_id": job_id,
-                "status": "completed",
-                "file1_name": file1.filename,
-                "file2_name": file2.filename,
-                "file1_path": str(file1_path),
-                "file2_path": str(file2_path),
-                "result_path": str(result_path),
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat(),
-                "changes_count": changes_count,
-                "result": {
-                    "total_differences": changes_count,
-                    "pages_affected": 1,
-                    "generated_at": datetime.now().isoformat()
-                },
-                "changes": changes,
-                "error_message": None
-            }
-
-            return {
-                "job_id": job_id,
-                "status": "completed",
-                "message": "PDFs compared successfully",
-                "changes_count": changes_count,
-                "result_url": f"/api/v1/jobs/{job_id}/result.png"
-            }
-
-        except Exception as e:
-            logger.error(f"✗ Job {job_id}: Comparison failed: {str(e)}")
-            jobs[job_id] = {
-                "job_id": job_id,
-                "status": "failed",
-                "error_message": str(e),
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat(),
-            }
-            raise HTTPException(status_code=500, detail=f"Comparison failed: {str(e)}")
+        # Create job record; extraction, diff and rendering run on the worker tier
+        now = datetime.now().isoformat()
+        job_store.create({
+            "job_id": job_id,
+            "status": "pending",
+            "stage": "queued",
+            "progress": 0.0,
+            "file1_name": file1.filename,
+            "file2_name": file2.filename,
+            "file1_key": file1_key,
+            "file2_key": file2_key,
+            "file1_size": file1_info["size"],
+            "file2_size": file2_info["size"],
+            "file1_sha256": file1_info["sha256"],
+            "file2_sha256": file2_info["sha256"],
+            "created_at": now,
+            "updated_at": now,
+            "error_message": None
+        })
+        comparison_service.submit(job_id)
+
+        return {
+            "job_id": job_id,
+            "status": "pending",
+            "created_at": now,
+            "message": "PDFs queued for comparison",
+            "status_url": f"/api/v1/jobs/{job_id}"
+        }
 
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Upload failed: {str(e)}")
+        job_store.transition(job_id, ("pending",), "failed", error_message=str(e))
         # Cleanup on error
-        if job_dir.exists():
-            shutil.rmtree(job_dir)
+        storage_service.delete(file1_key)
+        storage_service.delete(file2_key)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/v1/jobs/{job_id}")
-async def get_job_status(job_id: str):
+def get_job_status(job_id: str):
     """Get job status and metadata"""
-    if job_id not in jobs:
+    job = job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = jobs[job_id]
+    return job_status_response(job)
+
 
+def job_status_response(job):
+    """Public view of a job record, shared by the status and events endpoints"""
     # Return in the format expected by the frontend
     response = {
         "job_id": job["job_id"],
@@ -181,6 +154,10 @@ async def get_job_status(job_id: str):
         "created_at": job["created_at"],
         "updated_at": job["updated_at"],
         "error_message": job.get("error_message"),
+        "stage": job.get("stage"),
+        "progress": job.get("progress"),
+        "degraded": job.get("degraded", []),
+        "detail": job.get("detail", {}),
     }
 
     # Include result if available
@@ -190,28 +167,99 @@ async def get_job_status(job_id: str):
     return response
 
 
+# Sent first so proxies that buffer the start of a response flush it
+SSE_PADDING = ":" + " " * 2048 + "\n\n"
+SSE_HEARTBEAT_SECONDS = 15
+
+
+def sse_event(job):
+    data = json.dumps(job_status_response(job))
+    return f"id: {job['updated_at']}\nevent: status\ndata: {data}\n\n"
+
+
+@app.get("/api/v1/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Server-sent events stream of job status: stage transitions and page
+    progress. Closes after the job completes, fails or is cancelled.
+    """
+    # Subscribe before reading the snapshot so no update falls in between
+    subscription = await job_store.subscribe(job_id)
+    job = await run_in_threadpool(job_store.get, job_id)
+    if job is None:
+        await subscription.close()
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        try:
+            yield SSE_PADDING
+            yield "retry: 3000\n\n"
+            yield sse_event(job)
+            if job["status"] in TERMINAL_STATUSES:
+                return
+            while True:
+                update = await subscription.get(SSE_HEARTBEAT_SECONDS)
+                if update is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield sse_event(update)
+                if update["status"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            with anyio.CancelScope(shield=True):
+                await subscription.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache, no-transform",
+            # Ask nginx-style proxies not to buffer the stream
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
+@app.delete("/api/v1/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """Cancel a pending or running job and stop its worker task"""
+    job = job_store.transition(job_id, ("pending", "processing"), "cancelled",
+                               stage="cancelled", error_message="Cancelled by user")
+    if job is None:
+        job = job_store.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if job["status"] in TERMINAL_STATUSES:
+            raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+
+    comparison_service.cancel(job)
+
+    return {
+        "job_id": job_id,
+        "status": "cancelled",
+        "message": "Job cancelled"
+    }
+
+
 @app.get("/api/v1/jobs/{job_id}/result.png")
-async def get_job_result(job_id: str):
+def get_job_result(job_id: str, request: Request):
     """Download result image (side-by-side comparison)"""
-    if job_id not in jobs:
+    job = job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = jobs[job_id]
-
-    if job.get("status") != "completed" or "result_path" not in job:
+    if job.get("status") != "completed" or "result_key" not in job:
         raise HTTPException(status_code=400, detail="Result not available")
 
-    result_path = job.get("result_path")
-    if not result_path or not Path(result_path).exists():
-        raise HTTPException(status_code=404, detail="Result image not found")
-
-    return FileResponse(result_path, media_type="image/png")
+    return stream_object(request, job["result_key"], "image/png", "Result image not found",
+                         size=job.get("result_size"), sha256=job.get("result_sha256"))
 
 @app.get("/api/v1/jobs")
-async def list_jobs():
+def list_jobs():
     """List all jobs"""
+    jobs = job_store.list()
     jobs_list = []
-    for job in jobs.values():
+    for job in jobs:
         job_copy = job.copy()
         # Don't return raw changes in list response
         if "changes" in job_copy:
@@ -225,24 +273,119 @@ async def list_jobs():
 
 
 @app.get("/api/v1/jobs/{job_id}/files/{file_type}")
-async def get_job_file(job_id: str, file_type: str):
+def get_job_file(job_id: str, file_type: str, request: Request):
     """Download uploaded PDF file"""
-    if job_id not in jobs:
+    job = job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    job = jobs[job_id]
-
-    if file_type == "file1":
-        file_path = job.get("file1_path")
-    elif file_type == "file2":
-        file_path = job.get("file2_path")
-    else:
+    if file_type not in ("file1", "file2"):
         raise HTTPException(status_code=400, detail="Invalid file type")
 
-    if not file_path or not Path(file_path).exists():
+    file_key = job.get(f"{file_type}_key")
+    if not file_key:
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(file_path, media_type="application/pdf")
+    return stream_object(request, file_key, "application/pdf", "File not found",
+                         size=job.get(f"{file_type}_size"), sha256=job.get(f"{file_type}_sha256"))
+
+
+def etag_matches(header, etag):
+    """Check an If-None-Match / If-Range header value against our ETag"""
+    if header.strip() == "*":
+        return True
+    candidates = [c.strip() for c in header.split(",")]
+    # Weak comparison: W/"x" matches "x"
+    return any(c.removeprefix("W/") == etag for c in candidates)
+
+
+RANGE_SPEC = re.compile(r"^(\d*)-(\d*)$")
+
+
+def range_not_satisfiable(size):
+    return HTTPException(status_code=416, detail="Range not satisfiable",
+                         headers={"Content-Range": f"bytes */{size}"})
+
+
+def parse_range(header, size):
+    """
+    Parse a single "bytes=start-end" range into inclusive offsets.
+
+    Returns None when the header should be ignored (malformed or multiple
+    ranges, in which case we send the whole object) and raises 416 when the
+    range cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes":
+        return None
+    match = RANGE_SPEC.match(spec.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+
+    if first:
+        start = int(first)
+        if start >= size:
+            raise range_not_satisfiable(size)
+        end = int(last) if last else size - 1
+        if end < start:
+            return None
+    elif last:
+        # Suffix range: last N bytes
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise range_not_satisfiable(size)
+        start = max(0, size - suffix)
+        end = size - 1
+    else:
+        return None
+
+    return start, min(end, size - 1)
+
+
+def stream_object(request, key, media_type, not_found_detail, size=None, sha256=None):
+    """
+    Stream a stored object in chunks instead of loading it into memory,
+    honouring If-None-Match (304) and single-range Range requests (206).
+    """
+    try:
+        if size is None:
+            size = storage_service.size(key)
+    except ObjectNotFound:
+        raise HTTPException(status_code=404, detail=not_found_detail)
+
+    headers = {"Accept-Ranges": "bytes"}
+    etag = f'"{sha256}"' if sha256 else None
+    if etag:
+        headers["ETag"] = etag
+        headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or (etag and if_range.strip() == etag)):
+        byte_range = parse_range(range_header, size)
+
+    start, end = byte_range if byte_range else (0, size - 1)
+    try:
+        body = storage_service.iter_bytes(key, start, end) if byte_range else storage_service.iter_bytes(key)
+    except ObjectNotFound:
+        raise HTTPException(status_code=404, detail=not_found_detail)
+
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    return StreamingResponse(
+        body,
+        status_code=206 if byte_range else 200,
+        media_type=media_type,
+        headers=headers
+    )
 
 
 if __name__ == "__main__":
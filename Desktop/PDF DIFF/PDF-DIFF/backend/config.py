@@ -3,3 +3,14 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0")
 S3_BUCKET = os.getenv("S3_BUCKET", "pdf-uploads")
 S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "http://minio:9000")
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/tmp/pdf_uploads")
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", str(24 * 60 * 60)))
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY")
+S3_SECRET_KEY = os.getenv("S3_SECRET_KEY")
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+CACHE_DIR = os.getenv("CACHE_DIR", "/tmp/pdf_cache")
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+JOB_TIME_BUDGET_SECONDS = float(os.getenv("JOB_TIME_BUDGET_SECONDS", "300"))
+MIN_DIFF_SECONDS = float(os.getenv("MIN_DIFF_SECONDS", "5"))
+MIN_RENDER_SECONDS = float(os.getenv("MIN_RENDER_SECONDS", "10"))
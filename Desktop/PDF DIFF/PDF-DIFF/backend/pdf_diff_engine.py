@@ -5,22 +5,98 @@ import sys
 if sys.version_info[0] < 3 or sys.version_info[1] < 6:
     sys.exit("ERROR: Python version 3.6+ is required.")
 
-import json, subprocess, io, os
+import json, subprocess, io, os, time, difflib, math
 from lxml import etree
 from PIL import Image, ImageDraw, ImageOps
 
-def compute_changes(pdf_fn_1, pdf_fn_2, top_margin=0, bottom_margin=100):
+class ComparisonCancelled(Exception):
+    pass
+
+class DeadlineExceeded(Exception):
+    pass
+
+class Budget:
+    # A time budget for one comparison, checked at stage boundaries and
+    # while waiting on pdftotext/pdftoppm. `deadline_at` is a time.time()
+    # timestamp so the budget can be handed between machines. When it runs
+    # low the engine degrades to a coarser result and records what it gave
+    # up in `degraded`.
+    def __init__(self, deadline_at=None, is_cancelled=None, min_diff_seconds=5.0, diff_share=0.5):
+        self.deadline_at = deadline_at
+        self.is_cancelled = is_cancelled
+        self.min_diff_seconds = min_diff_seconds # below this, only diff whole pages
+        self.diff_share = diff_share # fraction of the remaining time the text diff may use
+        self.degraded = []
+
+    def remaining(self):
+        if self.deadline_at is None:
+            return None
+        return self.deadline_at - time.time()
+
+    def check(self):
+        if self.is_cancelled is not None and self.is_cancelled():
+            raise ComparisonCancelled("Comparison was cancelled.")
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded("Comparison exceeded its time budget.")
+
+    def degrade(self, what):
+        if what not in self.degraded:
+            self.degraded.append(what)
+
+def run_command(args, budget=None, poll_interval=0.5):
+    # Like subprocess.check_output, but kills the process as soon as the
+    # budget runs out or the comparison is cancelled.
+    if budget is None:
+        return subprocess.check_output(args)
+    budget.check()
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE)
+    try:
+        while True:
+            try:
+                remaining = budget.remaining()
+                timeout = poll_interval if remaining is None else max(0.01, min(poll_interval, remaining))
+                output, _ = proc.communicate(timeout=timeout)
+                break
+            except subprocess.TimeoutExpired:
+                budget.check()
+    except BaseException:
+        # Cancelled, out of time, or the worker itself is being terminated.
+        proc.kill()
+        proc.communicate()
+        raise
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, args, output)
+    return output
+
+def compute_changes(pdf_fn_1, pdf_fn_2, top_margin=0, bottom_margin=100, budget=None, progress=None):
+    # `progress`, if given, is called with a dict describing each step:
+    # pages extracted per PDF, the diff finishing, pages rendered.
+
     # Serialize the text in the two PDFs.
-    docs = [serialize_pdf(0, pdf_fn_1, top_margin, bottom_margin), serialize_pdf(1, pdf_fn_2, top_margin, bottom_margin)]
+    docs = [serialize_pdf(0, pdf_fn_1, top_margin, bottom_margin, budget, progress), serialize_pdf(1, pdf_fn_2, top_margin, bottom_margin, budget, progress)]
+
+    if budget is not None:
+        budget.check()
+        remaining = budget.remaining()
+        if remaining is not None and remaining < budget.min_diff_seconds:
+            # Not enough time left for a text diff; only report which pages changed.
+            budget.degrade("page_level_diff")
+            changes = perform_page_diff([docs[0][0], docs[1][0]])
+            if progress is not None:
+                progress({ "stage": "diff", "changes": len(changes) })
+            return changes
 
     # Compute differences between the serialized text.
-    diff = perform_diff(docs[0][1], docs[1][1])
+    diff = perform_diff(docs[0][1], docs[1][1], budget)
     changes = process_hunks(diff, [docs[0][0], docs[1][0]])
+    if progress is not None:
+        progress({ "stage": "diff", "changes": len(changes) })
 
     return changes
 
-def serialize_pdf(i, fn, top_margin, bottom_margin):
-    box_generator = pdf_to_bboxes(i, fn, top_margin, bottom_margin)
+def serialize_pdf(i, fn, top_margin, bottom_margin, budget=None, progress=None):
+    box_generator = pdf_to_bboxes(i, fn, top_margin, bottom_margin, budget, progress)
     box_generator = mark_eol_hyphens(box_generator)
 
     boxes = []
@@ -53,7 +129,21 @@ def serialize_pdf(i, fn, top_margin, bottom_margin):
     text = "".join(text)
     return boxes, text
 
-def pdf_to_bboxes(pdf_index, fn, top_margin=0, bottom_margin=100):
+# When extraction progress is reported, pdftotext runs over chunks of at
+# least EXTRACT_CHUNK_PAGES pages, and at most EXTRACT_MAX_RUNS times per
+# PDF, since every run reopens and re-parses the document.
+EXTRACT_CHUNK_PAGES = 10
+EXTRACT_MAX_RUNS = 10
+
+def pdf_page_count(fn, budget=None):
+    # Ask pdfinfo for the page count; None if it doesn't report one.
+    info = run_command(["pdfinfo", fn], budget)
+    for line in info.decode("latin-1").splitlines():
+        if line.startswith("Pages:"):
+            return int(line.split(":", 1)[1])
+    return None
+
+def pdf_to_bboxes(pdf_index, fn, top_margin=0, bottom_margin=100, budget=None, progress=None):
     # Get the bounding boxes of text runs in the PDF.
     # Each text run is returned as a dict.
     box_index = 0
@@ -61,39 +151,61 @@ def pdf_to_bboxes(pdf_index, fn, top_margin=0, bottom_margin=100):
         "index": pdf_index,
         "file": fn,
     }
-    xml = subprocess.check_output(["pdftotext", "-bbox", fn, "-"])
-
-    # This avoids PCDATA errors
-    codes_to_avoid = [ 0, 1, 2, 3, 4, 5, 6, 7, 8,
-                       11, 12,
-                       14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, ]
 
-    cleaned_xml = bytes([x for x in xml if x not in codes_to_avoid])
+    # With a progress callback, extract a few pages per pdftotext run so
+    # progress is reported as pages are actually extracted; otherwise (or
+    # if the page count is unknown) extract the whole file in one run.
+    page_count = pdf_page_count(fn, budget) if progress is not None else None
+    if page_count is None:
+        page_ranges = [(1, None)]
+    else:
+        chunk_pages = max(EXTRACT_CHUNK_PAGES, math.ceil(page_count / EXTRACT_MAX_RUNS))
+        page_ranges = [(first, min(first + chunk_pages - 1, page_count))
+                       for first in range(1, page_count + 1, chunk_pages)]
+
+    for first_page, last_page in page_ranges:
+        args = ["pdftotext", "-bbox"]
+        if last_page is not None:
+            args += ["-f", str(first_page), "-l", str(last_page)]
+        xml = run_command(args + [fn, "-"], budget)
+
+        # This avoids PCDATA errors
+        codes_to_avoid = [ 0, 1, 2, 3, 4, 5, 6, 7, 8,
+                           11, 12,
+                           14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, ]
+
+        cleaned_xml = bytes([x for x in xml if x not in codes_to_avoid])
+
+        dom = etree.fromstring(cleaned_xml)
+        pages = dom.findall(".//{http://www.w3.org/1999/xhtml}page")
+        for i, page in enumerate(pages):
+            pagedict = {
+                "number": first_page+i,
+                "width": float(page.get("width")),
+                "height": float(page.get("height"))
+            }
+            for word in page.findall("{http://www.w3.org/1999/xhtml}word"):
+                if float(word.get("yMax")) < (top_margin/100.0)*float(page.get("height")):
+                    continue
+                if float(word.get("yMin")) > (bottom_margin/100.0)*float(page.get("height")):
+                    continue
 
-    dom = etree.fromstring(cleaned_xml)
-    for i, page in enumerate(dom.findall(".//{http://www.w3.org/1999/xhtml}page")):
-        pagedict = {
-            "number": i+1,
-            "width": float(page.get("width")),
-            "height": float(page.get("height"))
-        }
-        for word in page.findall("{http://www.w3.org/1999/xhtml}word"):
-            if float(word.get("yMax")) < (top_margin/100.0)*float(page.get("height")):
-                continue
-            if float(word.get("yMin")) > (bottom_margin/100.0)*float(page.get("height")):
-                continue
-
-            yield {
-                "index": box_index,
-                "pdf": pdfdict,
-                "page": pagedict,
-                "x": float(word.get("xMin")),
-                "y": float(word.get("yMin")),
-                "width": float(word.get("xMax"))-float(word.get("xMin")),
-                "height": float(word.get("yMax"))-float(word.get("yMin")),
-                "text": word.text,
-                }
-            box_index += 1
+                yield {
+                    "index": box_index,
+                    "pdf": pdfdict,
+                    "page": pagedict,
+                    "x": float(word.get("xMin")),
+                    "y": float(word.get("yMin")),
+                    "width": float(word.get("xMax"))-float(word.get("xMin")),
+                    "height": float(word.get("yMax"))-float(word.get("yMin")),
+                    "text": word.text,
+                    }
+                box_index += 1
+
+        if progress is not None:
+            pages_done = last_page if last_page is not None else len(pages)
+            pages_total = page_count if page_count is not None else len(pages)
+            progress({ "stage": "extract", "pdf": pdf_index, "pages_done": pages_done, "pages_total": pages_total })
 
 def mark_eol_hyphens(boxes):
     # Replace end-of-line hyphens with discretionary hyphens so we can weed
@@ -117,12 +229,67 @@ def mark_eol_hyphen(box):
 	    if box['text'].endswith("-"):
         	box['text'] = box['text'][0:-1] + "\u00AD"
 
-def perform_diff(doc1text, doc2text):
+def perform_diff(doc1text, doc2text, budget=None):
     from fast_diff_match_patch import diff
-    return diff(doc1text,
-        doc2text,   
-        timelimit=0,
+    remaining = budget.remaining() if budget is not None else None
+    if remaining is None:
+        return diff(doc1text,
+            doc2text,
+            timelimit=0,
+            checklines=False)
+
+    # diff_match_patch returns a valid but coarser diff when it runs out of
+    # time, so give it a share of the budget and note if it used all of it.
+    timelimit = max(0.1, remaining * budget.diff_share)
+    start = time.time()
+    hunks = diff(doc1text,
+        doc2text,
+        timelimit=timelimit,
         checklines=False)
+    if time.time() - start >= timelimit * 0.95:
+        budget.degrade("diff_time_limited")
+    return hunks
+
+def perform_page_diff(boxes):
+    # Coarse fallback: align the two documents page by page and mark each
+    # page whose text differs with a single box covering the whole page.
+    pages = [[], []]
+    for idx in (0, 1):
+        for box in boxes[idx]:
+            if len(pages[idx]) == 0 or pages[idx][-1]["box"]["page"] != box["page"]:
+                pages[idx].append({ "box": box, "text": [] })
+            pages[idx][-1]["text"].append(box["text"])
+
+    def page_box(page):
+        box = page["box"]
+        return {
+            "index": box["index"],
+            "pdf": box["pdf"],
+            "page": box["page"],
+            "x": 0.0,
+            "y": 0.0,
+            "width": box["page"]["width"],
+            "height": box["page"]["height"],
+            "text": "",
+        }
+
+    texts = [["".join(page["text"]) for page in pages[idx]] for idx in (0, 1)]
+    changes = []
+    matcher = difflib.SequenceMatcher(None, texts[0], texts[1], autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            if len(changes) > 0 and changes[-1] != "*":
+                changes.append("*")
+            continue
+        for page in pages[0][i1:i2]:
+            changes.append(page_box(page))
+        for page in pages[1][j1:j2]:
+            changes.append(page_box(page))
+
+    if len(changes) > 0 and changes[-1] == "*":
+        changes.pop()
+
+    return changes
 
 def process_hunks(hunks, boxes):
     # Process each diff hunk one by one and look at their corresponding
@@ -184,7 +351,7 @@ def mark_difference(hunk_length, offset, boxes, changes):
     changes.append(boxes.pop(0))
 
 # Turns a JSON object of PDF changes into a PIL image object.
-def render_changes(changes, styles,width):
+def render_changes(changes, styles,width, budget=None, progress=None):
     # Merge sequential boxes to avoid sequential disjoint rectangles.
 
     changes = simplify_changes(changes)
@@ -193,7 +360,7 @@ def render_changes(changes, styles,width):
 
     # Make images for all of the pages named in changes.
 
-    pages = make_pages_images(changes,width)
+    pages = make_pages_images(changes,width, budget, progress)
 
     # Convert the box coordinates (PDF coordinates) into image coordinates.
     # Then set change["page"] = change["page"]["number"] so that we don't
@@ -229,14 +396,19 @@ def render_changes(changes, styles,width):
 
     return img
 
-def make_pages_images(changes,width):
+def make_pages_images(changes,width, budget=None, progress=None):
     pages = [{}, {}]
+    total = len(set((c["pdf"]["index"], c["page"]["number"]) for c in changes if c != "*"))
+    done = 0
     for change in changes:
         if change == "*": continue # not handled yet
         pdf_index = change["pdf"]["index"]
         pdf_page = change["page"]["number"]
         if pdf_page not in pages[pdf_index]:
-            pages[pdf_index][pdf_page] = pdftopng(change["pdf"]["file"], pdf_page,width)
+            pages[pdf_index][pdf_page] = pdftopng(change["pdf"]["file"], pdf_page,width, budget)
+            done += 1
+            if progress is not None:
+                progress({ "stage": "render", "pages_done": done, "pages_total": total })
     return pages
 
 def realign_pages(pages, changes):
@@ -437,8 +609,8 @@ def simplify_changes(boxes):
     return changes
 
 # Rasterizes a page of a PDF.
-def pdftopng(pdffile, pagenumber,width):
-    pngbytes = subprocess.check_output(["pdftoppm", "-f", str(pagenumber), "-l", str(pagenumber), "-scale-to", str(width), "-png", pdffile])
+def pdftopng(pdffile, pagenumber,width, budget=None):
+    pngbytes = run_command(["pdftoppm", "-f", str(pagenumber), "-l", str(pagenumber), "-scale-to", str(width), "-png", pdffile], budget)
     im = Image.open(io.BytesIO(pngbytes))
     return im.convert("RGBA")
 
@@ -1,9 +1,12 @@
-from backend.services.pdf_processor import pdf_processor, PDFProcessor
-from backend.services.storage_service import storage_service, StorageService
-from backend.services.comparison_service import comparison_service, ComparisonService
-from backend.services.celery_tasks import celery_app, compare_pdfs_task
+from .job_store import job_store, JobStore
+from .pdf_processor import pdf_processor, PDFProcessor
+from .storage_service import storage_service, StorageService
+from .comparison_service import comparison_service, ComparisonService
+from .celery_tasks import celery_app, compare_pdfs_task
 
 __all__ = [
+    'job_store',
+    'JobStore',
     'pdf_processor',
     'PDFProcessor',
     'storage_service',
@@ -0,0 +1,257 @@
+"""
+Celery worker tier for PDF comparisons.
+
+A comparison runs as two tasks on two queues so each tier scales on its own:
+
+    diff    compare_pdfs_task   pdftotext + text diff, stores changes.json
+    render  render_result_task  pdftoppm + image composition, stores result.png
+
+Inputs and outputs go through the storage service, so diff and render
+workers can run on different nodes.
+
+Start workers with e.g.
+
+    celery -A services.celery_tasks worker -Q diff --concurrency 8
+    celery -A services.celery_tasks worker -Q render --concurrency 2
+
+With CELERY_BROKER_URL=memory:// tasks run eagerly in the calling process,
+which gives a complete end-to-end pipeline without a broker.
+"""
+
+import logging
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from celery import Celery, uuid
+
+import config
+from pdf_diff_engine import Budget, ComparisonCancelled, DeadlineExceeded
+from services.job_store import job_store
+from services.pdf_processor import pdf_processor
+from services.storage_service import storage_service
+
+logger = logging.getLogger(__name__)
+
+DIFF_QUEUE = "diff"
+RENDER_QUEUE = "render"
+
+celery_app = Celery("pdf_diff", broker=config.CELERY_BROKER_URL)
+celery_app.conf.update(
+    task_serializer="json",
+    accept_content=["json"],
+    task_default_queue=DIFF_QUEUE,
+    task_routes={
+        "pdf_diff.compare": {"queue": DIFF_QUEUE},
+        "pdf_diff.render": {"queue": RENDER_QUEUE},
+    },
+    # Re-deliver tasks whose worker died mid-comparison.
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    task_always_eager=config.CELERY_BROKER_URL.startswith("memory://"),
+    task_eager_propagates=False,
+)
+
+# Exponential backoff 1s, 2s, 4s, then give up.
+RETRY_OPTIONS = dict(
+    autoretry_for=(Exception,),
+    retry_backoff=1,
+    retry_backoff_max=4,
+    retry_jitter=False,
+    max_retries=3,
+)
+
+
+class NoDifferencesError(Exception):
+    """The PDFs have identical text. Not retried."""
+
+
+def _fail(job_id, message):
+    logger.error(f"✗ Job {job_id}: Comparison failed: {message}")
+    job_store.transition(job_id, ("pending", "processing"), "failed",
+                         stage="failed", error_message=message)
+
+
+def _complete(job_id, job, degraded, **fields):
+    job_store.transition(job_id, ("processing",), "completed",
+                         stage="done", progress=1.0, degraded=degraded,
+                         result={
+                             "total_differences": job["changes_count"],
+                             "pages_affected": 1,
+                             "degraded": degraded,
+                             "generated_at": datetime.now().isoformat(),
+                         },
+                         **fields)
+
+
+def _update_processing(job_id, **fields):
+    # Worker writes only land while the job is still processing, so a job
+    # that was cancelled, failed or completed meanwhile is never overwritten
+    # (or re-announced to /events subscribers). Returns None in that case.
+    return job_store.transition(job_id, ("processing",), "processing", **fields)
+
+
+def _budget(job_id, job):
+    # The engine polls this while waiting on pdftotext/pdftoppm, so a
+    # DELETE from any API node stops the subprocess within a poll interval.
+    def is_cancelled():
+        current = job_store.get(job_id)
+        return current is None or current["status"] == "cancelled"
+
+    budget = Budget(deadline_at=job.get("deadline_at"), is_cancelled=is_cancelled,
+                    min_diff_seconds=config.MIN_DIFF_SECONDS)
+    budget.degraded = list(job.get("degraded") or [])
+    return budget
+
+
+class _ProgressReporter:
+    # Turns engine progress events into the job's overall 0-1 progress and
+    # page counters. Writes go to the job store, which also pushes them to
+    # /events subscribers, so they are throttled to one per interval.
+    def __init__(self, job_id, interval=0.5):
+        self.job_id = job_id
+        self.interval = interval
+        self.detail = {}
+        self._last_stage = None
+        self._last_write = 0.0
+
+    def __call__(self, event):
+        stage = event["stage"]
+        if stage == "extract":
+            pdf = event["pdf"]
+            self.detail[f"file{pdf + 1}_pages_extracted"] = event["pages_done"]
+            self.detail[f"file{pdf + 1}_pages_total"] = event["pages_total"]
+            progress = 0.1 + 0.15 * pdf + 0.15 * event["pages_done"] / max(1, event["pages_total"])
+            final = event["pages_done"] == event["pages_total"]
+        elif stage == "diff":
+            self.detail["diff_done"] = True
+            progress = 0.45
+            final = True
+        elif stage == "render":
+            self.detail["pages_rendered"] = event["pages_done"]
+            self.detail["pages_to_render"] = event["pages_total"]
+            progress = 0.5 + 0.45 * event["pages_done"] / event["pages_total"]
+            final = event["pages_done"] == event["pages_total"]
+        else:
+            return
+
+        now = time.monotonic()
+        if stage == self._last_stage and not final and now - self._last_write < self.interval:
+            return
+        self._last_stage = stage
+        self._last_write = now
+        _update_processing(self.job_id, stage=stage, progress=round(progress, 3), detail=dict(self.detail))
+
+
+def _run_stage(task, job_id, fn):
+    # Runs one stage; marks the job failed only once retries are exhausted.
+    try:
+        return fn()
+    except ComparisonCancelled:
+        logger.info(f"Job {job_id}: cancelled, stopped {task.name}")
+    except (NoDifferencesError, DeadlineExceeded) as e:
+        _fail(job_id, str(e))
+    except Exception as e:
+        if task.request.retries >= task.max_retries:
+            _fail(job_id, str(e))
+            return None
+        logger.warning(f"Job {job_id}: {task.name} failed, retrying: {e}")
+        raise
+
+
+@celery_app.task(bind=True, name="pdf_diff.compare", **RETRY_OPTIONS)
+def compare_pdfs_task(self, job_id):
+    """Diff stage: extract text from both PDFs, diff it and queue rendering."""
+
+    def run():
+        job = job_store.transition(job_id, ("pending", "processing"), "processing",
+                                   stage="extract", progress=0.1, attempts=self.request.retries + 1)
+        if job is None:
+            logger.info(f"Job {job_id}: no longer pending, skipping diff")
+            return
+        if job.get("deadline_at") is None:
+            # The budget starts when a worker picks the job up, not at upload,
+            # so time spent queued doesn't count. Retries keep the deadline.
+            job = _update_processing(job_id, deadline_at=time.time() + config.JOB_TIME_BUDGET_SECONDS)
+            if job is None:
+                logger.info(f"Job {job_id}: no longer processing, skipping diff")
+                return
+
+        budget = _budget(job_id, job)
+        with storage_service.local_file(job["file1_key"]) as file1_path, \
+                storage_service.local_file(job["file2_key"]) as file2_path:
+            changes = pdf_processor.compute(file1_path, file2_path, budget, _ProgressReporter(job_id))
+        changes_count = pdf_processor.count_changes(changes)
+        logger.info(f"✓ Job {job_id}: Changes computed ({changes_count} boxes)")
+        if changes_count == 0:
+            raise NoDifferencesError("There are no text differences.")
+
+        changes_key = f"{job_id}/changes.json"
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            changes_path = Path(tmp_dir) / "changes.json"
+            pdf_processor.save_changes(changes, changes_path)
+            storage_service.put_file(changes_key, changes_path)
+        job = _update_processing(job_id, stage="render", progress=0.5, degraded=budget.degraded,
+                                 changes_key=changes_key, changes_count=changes_count)
+        if job is None:
+            logger.info(f"Job {job_id}: no longer processing, not queuing render")
+            return
+
+        remaining = budget.remaining()
+        if remaining is not None and remaining < config.MIN_RENDER_SECONDS:
+            logger.warning(f"Job {job_id}: {remaining:.1f}s left, skipping render")
+            budget.degrade("render_skipped")
+            _complete(job_id, job, budget.degraded)
+            return
+
+        # Record the render task id before queuing it: once queued (or run
+        # eagerly) the render may complete the job, after which no writes land.
+        task_id = uuid()
+        if _update_processing(job_id, task_id=task_id) is None:
+            logger.info(f"Job {job_id}: no longer processing, not queuing render")
+            return
+        render_result_task.apply_async(args=[job_id], queue=RENDER_QUEUE, task_id=task_id)
+
+    return _run_stage(self, job_id, run)
+
+
+@celery_app.task(bind=True, name="pdf_diff.render", **RETRY_OPTIONS)
+def render_result_task(self, job_id):
+    """Render stage: draw the side-by-side result image and complete the job."""
+
+    def run():
+        job = job_store.get(job_id)
+        if job is None or job["status"] != "processing":
+            logger.info(f"Job {job_id}: no longer processing, skipping render")
+            return
+
+        budget = _budget(job_id, job)
+        progress = _ProgressReporter(job_id)
+        progress.detail = dict(job.get("detail") or {})
+        with storage_service.local_file(job["changes_key"]) as changes_path:
+            changes = pdf_processor.load_changes(changes_path)
+        result_key = f"{job_id}/result.png"
+        with storage_service.local_file(job["file1_key"]) as file1_path, \
+                storage_service.local_file(job["file2_key"]) as file2_path, \
+                tempfile.TemporaryDirectory() as tmp_dir:
+            pdf_paths = [file1_path, file2_path]
+            result_path = Path(tmp_dir) / "result.png"
+            try:
+                pdf_processor.render(changes, result_path, pdf_paths, budget, progress)
+            except DeadlineExceeded:
+                # The diff is done; finish without the image rather than fail.
+                logger.warning(f"Job {job_id}: out of time while rendering, skipping render")
+                budget.degrade("render_skipped")
+                _complete(job_id, job, budget.degraded)
+                return
+            result_info = storage_service.put_file(result_key, result_path)
+        logger.info(f"✓ Job {job_id}: Result image rendered and saved")
+
+        _complete(job_id, job, budget.degraded,
+                  result_key=result_key,
+                  result_size=result_info["size"],
+                  result_sha256=result_info["sha256"])
+
+    return _run_stage(self, job_id, run)
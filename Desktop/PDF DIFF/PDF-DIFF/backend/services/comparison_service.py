@@ -0,0 +1,45 @@
+"""
+Coordinates comparison jobs between the API and the Celery worker tier.
+"""
+
+import logging
+
+from celery import uuid
+
+from services.celery_tasks import celery_app, compare_pdfs_task, DIFF_QUEUE
+from services.job_store import job_store
+
+logger = logging.getLogger(__name__)
+
+
+class ComparisonService:
+    def submit(self, job_id):
+        """
+        Queue the diff stage for an uploaded job and remember its task id.
+        The id is stored first, while the job is still pending, so the
+        task's own writes can't be overwritten. Returns None if the job was
+        cancelled before it could be queued.
+        """
+        task_id = uuid()
+        if job_store.transition(job_id, ("pending",), "pending", task_id=task_id) is None:
+            logger.info(f"Job {job_id}: no longer pending, not queued")
+            return None
+        compare_pdfs_task.apply_async(args=[job_id], queue=DIFF_QUEUE, task_id=task_id)
+        logger.info(f"✓ Job {job_id}: Queued for comparison (task {task_id})")
+        return task_id
+
+    def cancel(self, job):
+        """
+        Stop work on a job that was already marked cancelled. Revoking drops
+        the task if it hasn't started yet. A running task notices the
+        cancelled status within a poll interval, kills its pdftotext/pdftoppm
+        and returns, so it is not terminated here: prefork children die on
+        SIGTERM without unwinding and would leave the subprocess running.
+        """
+        task_id = job.get("task_id")
+        if task_id and not celery_app.conf.task_always_eager:
+            celery_app.control.revoke(task_id)
+        logger.info(f"✓ Job {job['job_id']}: Cancelled (task {task_id})")
+
+
+comparison_service = ComparisonService()
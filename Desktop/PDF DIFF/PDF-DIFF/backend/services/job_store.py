@@ -0,0 +1,310 @@
+"""
+Shared job state for the comparison API.
+
+Every API worker (and every replica behind the load balancer) reads and
+writes job records through this module, so any process can answer any
+job. The backend is picked from REDIS_URL:
+
+    redis://host:6379/0   -> RedisJobStore (shared, multi-worker/multi-node)
+    memory://             -> MemoryJobStore (single process, local dev/tests)
+
+Every write is also published to the job's event channel, which is what
+the /api/v1/jobs/{id}/events stream listens on.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Statuses after which a job never changes again
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+def _now():
+    return datetime.now().isoformat()
+
+
+class JobStore:
+    """Interface shared by the job-state backends."""
+
+    def create(self, job):
+        """Store a new job record. Returns False if the id already exists."""
+        raise NotImplementedError
+
+    def get(self, job_id):
+        """Return the job record, or None if it does not exist."""
+        raise NotImplementedError
+
+    def update(self, job_id, **fields):
+        """Atomically merge fields into a job. Returns the new record or None."""
+        return self.transition(job_id, None, None, **fields)
+
+    def transition(self, job_id, from_statuses, to_status, **fields):
+        """
+        Atomically move a job to `to_status` if its current status is one of
+        `from_statuses` (None accepts any status), merging `fields` into the
+        record. Returns the updated record, or None if the job is missing or
+        was not in an allowed status.
+        """
+        raise NotImplementedError
+
+    def list(self):
+        """Return all known job records, oldest first."""
+        raise NotImplementedError
+
+    async def subscribe(self, job_id):
+        """
+        Subscribe to updates of one job. Returns a subscription whose
+        `await get(timeout)` yields the next job record (or None on timeout);
+        call `await close()` when done.
+        """
+        raise NotImplementedError
+
+
+def _apply(job, from_statuses, to_status, fields):
+    # Shared compare-and-set logic; returns None when the transition is refused.
+    if job is None:
+        return None
+    if from_statuses is not None and job.get("status") not in from_statuses:
+        return None
+    job = dict(job)
+    job.update(fields)
+    if to_status is not None:
+        job["status"] = to_status
+    job["updated_at"] = _now()
+    return job
+
+
+class _QueueSubscription:
+    # One /events client: updates for its job are pushed onto a queue owned
+    # by the client's event loop, and `close()` removes it from the store.
+    def __init__(self, store, job_id):
+        self._store = store
+        self._job_id = job_id
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+
+    def put(self, job):
+        # Called from whichever thread wrote the job.
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, job)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self._store._unsubscribe(self._job_id, self)
+
+
+class MemoryJobStore(JobStore):
+    """In-process stand-in for Redis. Only safe with a single worker process."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            if job["job_id"] in self._jobs:
+                return False
+            self._jobs[job["job_id"]] = dict(job)
+            return True
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def transition(self, job_id, from_statuses, to_status, **fields):
+        with self._lock:
+            job = _apply(self._jobs.get(job_id), from_statuses, to_status, fields)
+            if job is None:
+                return None
+            self._jobs[job_id] = job
+            subscribers = list(self._subscribers.get(job_id, ()))
+        for subscription in subscribers:
+            subscription.put(dict(job))
+        return dict(job)
+
+    def list(self):
+        with self._lock:
+            return [dict(j) for j in self._jobs.values()]
+
+    async def subscribe(self, job_id):
+        subscription = _QueueSubscription(self, job_id)
+        with self._lock:
+            self._subscribers.setdefault(job_id, []).append(subscription)
+        return subscription
+
+    def _unsubscribe(self, job_id, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(job_id, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+
+class RedisJobStore(JobStore):
+    """Job records stored as JSON strings in Redis, shared by all workers."""
+
+    def __init__(self, url, ttl_seconds, prefix="pdfdiff"):
+        import redis
+
+        self._url = url
+        self._async_redis = None
+        self._subscribers = {}
+        self._listener = None
+        self._listener_lock = None
+        self._listener_loop = None
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._ttl = ttl_seconds
+        self._prefix = prefix
+        self._index = f"{prefix}:jobs"
+        # Index the job only if SET NX created it, so a duplicate create
+        # leaves the existing job's position in the index alone.
+        self._create_script = self._redis.register_script("""
+            if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+                redis.call('ZADD', KEYS[2], ARGV[3], ARGV[4])
+                return 1
+            end
+            return 0
+        """)
+
+    def _key(self, job_id):
+        return f"{self._prefix}:job:{job_id}"
+
+    def _channel(self, job_id):
+        return f"{self._prefix}:events:{job_id}"
+
+    def create(self, job):
+        created = self._create_script(
+            keys=[self._key(job["job_id"]), self._index],
+            args=[json.dumps(job), self._ttl, time.time(), job["job_id"]],
+        )
+        return bool(created)
+
+    def get(self, job_id):
+        raw = self._redis.get(self._key(job_id))
+        return json.loads(raw) if raw is not None else None
+
+    def transition(self, job_id, from_statuses, to_status, **fields):
+        import redis
+
+        key = self._key(job_id)
+        with self._redis.pipeline() as pipe:
+            while True:
+                try:
+                    # Optimistic lock: the MULTI/EXEC fails if another worker
+                    # wrote the key between our read and our write.
+                    pipe.watch(key)
+                    raw = pipe.get(key)
+                    job = _apply(json.loads(raw) if raw is not None else None,
+                                 from_statuses, to_status, fields)
+                    if job is None:
+                        pipe.unwatch()
+                        return None
+                    raw = json.dumps(job)
+                    pipe.multi()
+                    pipe.set(key, raw, keepttl=True)
+                    pipe.publish(self._channel(job_id), raw)
+                    pipe.execute()
+                    return job
+                except redis.WatchError:
+                    continue
+
+    def list(self):
+        # Drop index entries whose records have already expired.
+        self._redis.zremrangebyscore(self._index, "-inf", time.time() - self._ttl)
+        job_ids = self._redis.zrange(self._index, 0, -1)
+        if not job_ids:
+            return []
+        raws = self._redis.mget([self._key(j) for j in job_ids])
+        return [json.loads(raw) for raw in raws if raw is not None]
+
+    async def subscribe(self, job_id):
+        await self._ensure_listener()
+        subscription = _QueueSubscription(self, job_id)
+        self._subscribers.setdefault(job_id, []).append(subscription)
+        return subscription
+
+    def _unsubscribe(self, job_id, subscription):
+        subscribers = self._subscribers.get(job_id, [])
+        if subscription in subscribers:
+            subscribers.remove(subscription)
+        if not subscribers:
+            self._subscribers.pop(job_id, None)
+
+    async def _ensure_listener(self):
+        # A single pattern subscription per process carries every job's
+        # events and fans them out to the local /events clients, so idle
+        # streams don't each hold a Redis connection.
+        loop = asyncio.get_running_loop()
+        if self._listener_loop is not loop:
+            # The listener, its connection and lock belong to one event loop.
+            self._listener_loop = loop
+            self._subscribers = {}
+            self._listener = None
+            self._listener_lock = asyncio.Lock()
+            self._async_redis = None
+        if self._listener is not None and not self._listener.done():
+            return
+        async with self._listener_lock:
+            if self._listener is not None and not self._listener.done():
+                return
+            if self._async_redis is None:
+                import redis.asyncio
+
+                self._async_redis = redis.asyncio.Redis.from_url(self._url, decode_responses=True)
+            pubsub = self._async_redis.pubsub()
+            await pubsub.psubscribe(self._channel("*"))
+            # Wait for the confirmation, so every write made after
+            # subscribe() returns is seen by the listener.
+            while True:
+                message = await pubsub.get_message(timeout=1.0)
+                if message is not None and message["type"] == "psubscribe":
+                    break
+            self._listener = asyncio.create_task(self._listen(pubsub))
+
+    async def _listen(self, pubsub):
+        channel_prefix = self._channel("")
+        try:
+            while True:
+                try:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                except Exception as e:
+                    # The next get_message reconnects and re-subscribes.
+                    logger.warning(f"Job event listener error, reconnecting: {e}")
+                    await asyncio.sleep(1.0)
+                    continue
+                if message is None or message["type"] != "pmessage":
+                    continue
+                subscribers = self._subscribers.get(message["channel"][len(channel_prefix):])
+                if not subscribers:
+                    continue
+                job = json.loads(message["data"])
+                for subscription in list(subscribers):
+                    subscription.put(dict(job))
+        finally:
+            await pubsub.aclose()
+
+
+def create_job_store(url=None):
+    """Build the job store selected by REDIS_URL."""
+    url = url or config.REDIS_URL
+    if url.startswith("memory://"):
+        return MemoryJobStore()
+    return RedisJobStore(url, ttl_seconds=config.JOB_TTL_SECONDS)
+
+
+job_store = create_job_store()
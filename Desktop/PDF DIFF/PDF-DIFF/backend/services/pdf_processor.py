@@ -0,0 +1,62 @@
+"""
+Thin wrapper around the pdf-diff1 engine used by the worker tasks.
+
+The comparison is split in two stages so they can run on separate queues:
+`compute` (pdftotext + text diff, cheap) and `render` (pdftoppm +
+image composition, expensive).
+"""
+
+import json
+
+from pdf_diff_engine import compute_changes, render_changes
+
+
+class PDFProcessor:
+    def __init__(self, top_margin=0, bottom_margin=100, styles=("box", "box"), width=900):
+        self.top_margin = top_margin
+        self.bottom_margin = bottom_margin
+        self.styles = list(styles)
+        self.width = width
+
+    def compute(self, file1_path, file2_path, budget=None, progress=None):
+        """Extract text boxes from both PDFs and diff them."""
+        return compute_changes(
+            str(file1_path),
+            str(file2_path),
+            top_margin=self.top_margin,
+            bottom_margin=self.bottom_margin,
+            budget=budget,
+            progress=progress
+        )
+
+    def render(self, changes, result_path, pdf_paths=None, budget=None, progress=None):
+        """
+        Render changes side-by-side with red boxes and save as PNG.
+
+        `pdf_paths` re-points the boxes at local copies of the two PDFs when
+        rendering on a different node than the one that computed the diff.
+        """
+        if pdf_paths is not None:
+            for change in changes:
+                if change != "*":
+                    change["pdf"]["file"] = str(pdf_paths[change["pdf"]["index"]])
+
+        result_image = render_changes(changes, self.styles, width=self.width, budget=budget, progress=progress)
+        result_image.save(result_path, "PNG")
+
+    @staticmethod
+    def count_changes(changes):
+        return len([c for c in changes if c != "*"])
+
+    @staticmethod
+    def save_changes(changes, path):
+        with open(path, "w") as f:
+            json.dump(changes, f)
+
+    @staticmethod
+    def load_changes(path):
+        with open(path) as f:
+            return json.load(f)
+
+
+pdf_processor = PDFProcessor()
@@ -0,0 +1,392 @@
+"""
+Object storage for uploaded PDFs and comparison artifacts.
+
+Objects are addressed by key ("<job_id>/file1.pdf", "<job_id>/result.png").
+The backend is picked from STORAGE_BACKEND:
+
+    local   LocalStorage, files under UPLOAD_DIR (single node or shared volume)
+    s3      S3Storage, any S3-compatible service (AWS S3, MinIO) at S3_ENDPOINT_URL
+
+S3Storage keeps recently used objects in a bounded on-disk cache under
+CACHE_DIR, so workers and API nodes don't re-download hot PDFs and results.
+Code that needs a real file (pdftotext, pdftoppm) uses `local_file(key)`,
+which hands out a private hard link that cache eviction cannot remove.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import config
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ObjectNotFound(Exception):
+    pass
+
+
+def _iter_file(f, start=0, end=None, chunk_size=CHUNK_SIZE):
+    # Yields bytes [start, end] (inclusive) of an open file without reading it
+    # whole. Taking the open file means a later unlink can't break the stream.
+    with f:
+        f.seek(start)
+        remaining = None if end is None else end - start + 1
+        while remaining is None or remaining > 0:
+            chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def _link_or_copy(src, dest):
+    # Hard links are free and survive the source being unlinked; fall back to
+    # a copy on filesystems without them.
+    try:
+        os.link(src, dest)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+class StorageService:
+    """Interface shared by the storage backends."""
+
+    def put(self, key, fileobj):
+        """
+        Stream a file-like object into storage. Returns {"size", "sha256"},
+        hashed on the way through so callers can use it as an ETag.
+        """
+        raise NotImplementedError
+
+    def put_file(self, key, path):
+        """Store a local file under key. Returns {"size", "sha256"}."""
+        with open(path, "rb") as f:
+            return self.put(key, f)
+
+    def size(self, key):
+        """Return the object size, raising ObjectNotFound if it is missing."""
+        raise NotImplementedError
+
+    def exists(self, key):
+        try:
+            self.size(key)
+            return True
+        except ObjectNotFound:
+            return False
+
+    def iter_bytes(self, key, start=0, end=None, chunk_size=CHUNK_SIZE):
+        """Yield the object's bytes [start, end] (inclusive) in chunks."""
+        raise NotImplementedError
+
+    def local_file(self, key):
+        """
+        Context manager yielding a path on this node's disk with the object's
+        contents. The path stays valid until the block exits.
+        """
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Remove an object; missing objects are ignored."""
+        raise NotImplementedError
+
+
+class LocalStorage(StorageService):
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key):
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def put(self, key, fileobj):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp name first so readers never see a partial object.
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+        reader = _HashingReader(fileobj)
+        with open(tmp_path, "wb") as buffer:
+            shutil.copyfileobj(reader, buffer, CHUNK_SIZE)
+        os.replace(tmp_path, path)
+        return reader.info()
+
+    def size(self, key):
+        try:
+            return self._path(key).stat().st_size
+        except FileNotFoundError:
+            raise ObjectNotFound(key)
+
+    def iter_bytes(self, key, start=0, end=None, chunk_size=CHUNK_SIZE):
+        try:
+            f = open(self._path(key), "rb")
+        except FileNotFoundError:
+            raise ObjectNotFound(key)
+        return _iter_file(f, start, end, chunk_size)
+
+    @contextmanager
+    def local_file(self, key):
+        # Stored objects are only replaced atomically, never evicted.
+        path = self._path(key)
+        if not path.exists():
+            raise ObjectNotFound(key)
+        yield path
+
+    def delete(self, key):
+        self._path(key).unlink(missing_ok=True)
+
+
+class LocalCache:
+    """
+    Size-bounded LRU cache of objects on this node's disk.
+
+    Entries may be evicted at any time, so readers either keep an open file
+    (`open`) or take a hard link (`link`) rather than holding a cache path.
+    Dot-prefixed files and directories (partial downloads, work dirs) are
+    not cache entries and are never evicted.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path(self, key):
+        return self.root / key
+
+    def open(self, key):
+        """Open a cached object for reading, or return None on a miss."""
+        path = self.path(key)
+        try:
+            f = open(path, "rb")
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            return None
+        return f
+
+    def link(self, key, dest):
+        """Hard-link a cached object to dest. Returns False on a miss."""
+        path = self.path(key)
+        try:
+            _link_or_copy(path, dest)
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def add(self, key, src):
+        """Add a local file to the cache without moving it."""
+        tmp_path = self.temp_path(key)
+        try:
+            _link_or_copy(src, tmp_path)
+            self.commit(key, tmp_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def work_dir(self):
+        """Private temp dir on the cache's filesystem, so links into it work."""
+        return tempfile.TemporaryDirectory(prefix=".work-", dir=self.root)
+
+    def temp_path(self, key):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+
+    def discard(self, key):
+        self.path(key).unlink(missing_ok=True)
+
+    def commit(self, key, tmp_path):
+        os.replace(tmp_path, self.path(key))
+        self.evict()
+        return self.path(key)
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.root.rglob("*"):
+                if any(part.startswith(".") for part in path.relative_to(self.root).parts):
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                if path.is_file():
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+            for mtime, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+
+
+class S3Storage(StorageService):
+    def __init__(self, bucket, endpoint_url, access_key=None, secret_key=None,
+                 region=None, cache=None):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.exceptions import ClientError
+
+        self.bucket = bucket
+        self.cache = cache
+        self._client_error = ClientError
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            region_name=region,
+        )
+        # Uploads above 8MB go out as concurrent multipart parts.
+        self._transfer_config = TransferConfig(
+            multipart_threshold=8 * 1024 * 1024,
+            multipart_chunksize=8 * 1024 * 1024,
+        )
+        self._bucket_checked = False
+
+    def _ensure_bucket(self):
+        if self._bucket_checked:
+            return
+        try:
+            self._client.head_bucket(Bucket=self.bucket)
+        except self._client_error as e:
+            # Only a missing bucket is created; access errors (403) and the
+            # like must surface rather than be masked by a create attempt.
+            if self._error_code(e) not in ("404", "NoSuchBucket", "NotFound"):
+                raise
+            self._client.create_bucket(Bucket=self.bucket)
+        self._bucket_checked = True
+
+    @staticmethod
+    def _error_code(error):
+        return error.response.get("Error", {}).get("Code")
+
+    def _is_not_found(self, error):
+        return self._error_code(error) in ("404", "NoSuchKey", "NotFound")
+
+    def put(self, key, fileobj):
+        self._ensure_bucket()
+        reader = _HashingReader(fileobj)
+        self._client.upload_fileobj(reader, self.bucket, key, Config=self._transfer_config)
+        return reader.info()
+
+    def size(self, key):
+        if self.cache is not None:
+            try:
+                return self.cache.path(key).stat().st_size
+            except FileNotFoundError:
+                pass
+        try:
+            return self._client.head_object(Bucket=self.bucket, Key=key)["ContentLength"]
+        except self._client_error as e:
+            if self._is_not_found(e):
+                raise ObjectNotFound(key)
+            raise
+
+    def _get_body(self, key, start=0, end=None):
+        kwargs = {"Bucket": self.bucket, "Key": key}
+        if start or end is not None:
+            kwargs["Range"] = f"bytes={start}-{'' if end is None else end}"
+        try:
+            return self._client.get_object(**kwargs)["Body"]
+        except self._client_error as e:
+            if self._is_not_found(e):
+                raise ObjectNotFound(key)
+            raise
+
+    def iter_bytes(self, key, start=0, end=None, chunk_size=CHUNK_SIZE):
+        cached = self.cache.open(key) if self.cache else None
+        if cached is not None:
+            return _iter_file(cached, start, end, chunk_size)
+
+        body = self._get_body(key, start, end)
+        if self.cache is None or start or end is not None:
+            return body.iter_chunks(chunk_size)
+        return self._iter_and_cache(key, body, chunk_size)
+
+    def _iter_and_cache(self, key, body, chunk_size):
+        # Stream to the client while filling the cache; only a fully read
+        # object is committed.
+        tmp_path = self.cache.temp_path(key)
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in body.iter_chunks(chunk_size):
+                    f.write(chunk)
+                    yield chunk
+            self.cache.commit(key, tmp_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    @contextmanager
+    def local_file(self, key):
+        # The work dir holds our own link to the object, so eviction by other
+        # tasks can't pull it out from under pdftotext/pdftoppm, and it is
+        # removed with everything in it when the block exits.
+        work_dir = self.cache.work_dir() if self.cache is not None else tempfile.TemporaryDirectory(prefix="pdfdiff-")
+        with work_dir as work_path:
+            path = Path(work_path) / Path(key).name
+            if self.cache is None or not self.cache.link(key, path):
+                try:
+                    self._client.download_file(self.bucket, key, str(path))
+                except self._client_error as e:
+                    if self._is_not_found(e):
+                        raise ObjectNotFound(key)
+                    raise
+                if self.cache is not None:
+                    self.cache.add(key, path)
+            yield path
+
+    def delete(self, key):
+        if self.cache is not None:
+            self.cache.discard(key)
+        self._client.delete_object(Bucket=self.bucket, Key=key)
+
+
+class _HashingReader:
+    # File-like wrapper that counts and hashes bytes as they are streamed out.
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._sha256 = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size=-1):
+        chunk = self._fileobj.read(size)
+        self._sha256.update(chunk)
+        self.size += len(chunk)
+        return chunk
+
+    def info(self):
+        return {"size": self.size, "sha256": self._sha256.hexdigest()}
+
+
+def create_storage_service(backend=None):
+    """Build the storage backend selected by STORAGE_BACKEND."""
+    backend = backend or config.STORAGE_BACKEND
+    if backend == "local":
+        return LocalStorage(config.UPLOAD_DIR)
+    if backend == "s3":
+        return S3Storage(
+            config.S3_BUCKET,
+            config.S3_ENDPOINT_URL,
+            access_key=config.S3_ACCESS_KEY,
+            secret_key=config.S3_SECRET_KEY,
+            region=config.S3_REGION,
+            cache=LocalCache(config.CACHE_DIR, config.CACHE_MAX_BYTES),
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+storage_service = create_storage_service()
@@ -0,0 +1,10 @@
+import os
+import sys
+from pathlib import Path
+
+# The backend is imported as a flat module layout (app, config, services.*)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Run the module-level job store and Celery app without Redis or a broker
+os.environ.setdefault("REDIS_URL", "memory://")
+os.environ.setdefault("CELERY_BROKER_URL", "memory://")
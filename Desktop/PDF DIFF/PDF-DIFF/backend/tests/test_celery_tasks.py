@@ -0,0 +1,235 @@
+import importlib
+import io
+import time
+
+import pytest
+
+import config
+from pdf_diff_engine import DeadlineExceeded
+from services import celery_tasks
+from services.job_store import MemoryJobStore
+from services.storage_service import LocalStorage
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    store = MemoryJobStore()
+    storage = LocalStorage(tmp_path)
+    monkeypatch.setattr(celery_tasks, "job_store", store)
+    monkeypatch.setattr(celery_tasks, "storage_service", storage)
+    storage.put("job-1/file1.pdf", io.BytesIO(b"%PDF-1"))
+    storage.put("job-1/file2.pdf", io.BytesIO(b"%PDF-2"))
+    store.create({
+        "job_id": "job-1",
+        "status": "pending",
+        "file1_key": "job-1/file1.pdf",
+        "file2_key": "job-1/file2.pdf",
+        "created_at": "t0",
+        "updated_at": "t0",
+    })
+    return store
+
+
+def stub_compute(monkeypatch, budgets, changes=None):
+    def compute(file1_path, file2_path, budget=None, progress=None):
+        budgets.append(budget)
+        if changes is None:
+            raise RuntimeError("stop after the budget is built")
+        return changes
+    monkeypatch.setattr(celery_tasks.pdf_processor, "compute", compute)
+
+
+def test_deadline_starts_when_worker_picks_up_job(env, monkeypatch):
+    budgets = []
+    stub_compute(monkeypatch, budgets)
+    monkeypatch.setattr(celery_tasks.compare_pdfs_task, "max_retries", 0)
+
+    before = time.time()
+    celery_tasks.compare_pdfs_task.apply(args=["job-1"])
+
+    deadline_at = env.get("job-1")["deadline_at"]
+    assert before + config.JOB_TIME_BUDGET_SECONDS <= deadline_at
+    assert deadline_at <= time.time() + config.JOB_TIME_BUDGET_SECONDS
+    assert budgets[0].deadline_at == deadline_at
+
+
+def test_retry_keeps_existing_deadline(env, monkeypatch):
+    budgets = []
+    stub_compute(monkeypatch, budgets)
+    monkeypatch.setattr(celery_tasks.compare_pdfs_task, "max_retries", 0)
+    env.update("job-1", status="processing", deadline_at=123.0)
+
+    celery_tasks.compare_pdfs_task.apply(args=["job-1"])
+
+    assert budgets[0].deadline_at == 123.0
+    assert env.get("job-1")["status"] == "failed"
+
+
+def test_cancelled_job_is_not_started(env, monkeypatch):
+    budgets = []
+    stub_compute(monkeypatch, budgets)
+    env.transition("job-1", ("pending",), "cancelled")
+
+    celery_tasks.compare_pdfs_task.apply(args=["job-1"])
+
+    assert budgets == []
+    assert env.get("job-1")["status"] == "cancelled"
+
+
+def test_progress_is_not_written_after_cancel(env):
+    env.transition("job-1", ("pending",), "processing", stage="extract")
+    env.transition("job-1", ("processing",), "cancelled", stage="cancelled")
+
+    celery_tasks._ProgressReporter("job-1")({"stage": "render", "pages_done": 2, "pages_total": 2})
+
+    job = env.get("job-1")
+    assert job["status"] == "cancelled"
+    assert job["stage"] == "cancelled"
+    assert "progress" not in job
+
+
+def test_cancel_during_diff_does_not_queue_render(env, monkeypatch):
+    queued = []
+    monkeypatch.setattr(celery_tasks.render_result_task, "apply_async",
+                        lambda *args, **kwargs: queued.append(kwargs))
+    change = {"pdf": {"index": 0, "file": "a"}, "page": {"number": 1}}
+
+    def save_changes(changes, path):
+        # DELETE arrives while the changes are being stored
+        env.transition("job-1", ("processing",), "cancelled", stage="cancelled")
+        path.write_text("[]")
+
+    monkeypatch.setattr(celery_tasks.pdf_processor, "compute", lambda *args: [change])
+    monkeypatch.setattr(celery_tasks.pdf_processor, "save_changes", save_changes)
+
+    celery_tasks.compare_pdfs_task.apply(args=["job-1"])
+
+    job = env.get("job-1")
+    assert queued == []
+    assert job["status"] == "cancelled"
+    assert "changes_key" not in job
+
+
+def test_render_task_id_is_stored_before_queuing(env, monkeypatch):
+    queued = []
+
+    def apply_async(args, queue, task_id):
+        queued.append((task_id, env.get("job-1")["task_id"]))
+
+    monkeypatch.setattr(celery_tasks.render_result_task, "apply_async", apply_async)
+    change = {"pdf": {"index": 0, "file": "a"}, "page": {"number": 1}}
+    monkeypatch.setattr(celery_tasks.pdf_processor, "compute", lambda *args: [change])
+
+    celery_tasks.compare_pdfs_task.apply(args=["job-1"])
+
+    assert len(queued) == 1
+    assert queued[0][0] == queued[0][1]
+    assert env.get("job-1")["stage"] == "render"
+
+
+def test_submit_skips_cancelled_job(env, monkeypatch):
+    # services/__init__ re-exports the instance under the module's name
+    module = importlib.import_module("services.comparison_service")
+
+    queued = []
+    monkeypatch.setattr(module, "job_store", env)
+    monkeypatch.setattr(module.compare_pdfs_task, "apply_async",
+                        lambda *args, **kwargs: queued.append(kwargs))
+    env.transition("job-1", ("pending",), "cancelled")
+
+    assert module.comparison_service.submit("job-1") is None
+    assert queued == []
+    assert "task_id" not in env.get("job-1")
+
+
+def test_render_out_of_time_completes_without_image(env, monkeypatch):
+    celery_tasks.storage_service.put("job-1/changes.json", io.BytesIO(b"[]"))
+    env.transition("job-1", ("pending",), "processing", stage="render",
+                   changes_key="job-1/changes.json", changes_count=4)
+
+    def render(*args, **kwargs):
+        raise DeadlineExceeded("Comparison exceeded its time budget.")
+
+    monkeypatch.setattr(celery_tasks.pdf_processor, "render", render)
+
+    celery_tasks.render_result_task.apply(args=["job-1"])
+
+    job = env.get("job-1")
+    assert job["status"] == "completed"
+    assert job["degraded"] == ["render_skipped"]
+    assert job["result"]["degraded"] == ["render_skipped"]
+    assert job["result"]["total_differences"] == 4
+    assert "result_key" not in job
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def reporter(env, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(celery_tasks.time, "monotonic", clock.monotonic)
+    env.transition("job-1", ("pending",), "processing", stage="extract")
+    writes = []
+    env_transition = env.transition
+
+    def transition(job_id, from_statuses, to_status, **fields):
+        writes.append(fields)
+        return env_transition(job_id, from_statuses, to_status, **fields)
+
+    monkeypatch.setattr(env, "transition", transition)
+    return celery_tasks._ProgressReporter("job-1"), clock, writes
+
+
+@pytest.mark.parametrize("event, progress", [
+    ({"stage": "extract", "pdf": 0, "pages_done": 5, "pages_total": 10}, 0.175),
+    ({"stage": "extract", "pdf": 0, "pages_done": 10, "pages_total": 10}, 0.25),
+    ({"stage": "extract", "pdf": 1, "pages_done": 10, "pages_total": 10}, 0.4),
+    ({"stage": "extract", "pdf": 0, "pages_done": 0, "pages_total": 0}, 0.1),
+    ({"stage": "diff", "changes": 3}, 0.45),
+    ({"stage": "render", "pages_done": 1, "pages_total": 2}, 0.725),
+    ({"stage": "render", "pages_done": 2, "pages_total": 2}, 0.95),
+])
+def test_progress_mapping(env, reporter, event, progress):
+    report, _, _ = reporter
+    report(event)
+    job = env.get("job-1")
+    assert job["stage"] == event["stage"]
+    assert job["progress"] == progress
+
+
+def test_progress_detail_accumulates(env, reporter):
+    report, clock, _ = reporter
+    report({"stage": "extract", "pdf": 0, "pages_done": 10, "pages_total": 10})
+    report({"stage": "extract", "pdf": 1, "pages_done": 4, "pages_total": 8})
+    clock.now += 1
+    report({"stage": "diff", "changes": 3})
+    assert env.get("job-1")["detail"] == {
+        "file1_pages_extracted": 10, "file1_pages_total": 10,
+        "file2_pages_extracted": 4, "file2_pages_total": 8,
+        "diff_done": True,
+    }
+
+
+def test_progress_throttles_but_always_writes_final_and_stage_changes(env, reporter):
+    report, clock, writes = reporter
+    report({"stage": "render", "pages_done": 1, "pages_total": 4})
+    clock.now += 0.1
+    report({"stage": "render", "pages_done": 2, "pages_total": 4})  # throttled
+    clock.now += 0.1
+    report({"stage": "render", "pages_done": 4, "pages_total": 4})  # final
+    assert [w["detail"]["pages_rendered"] for w in writes] == [1, 4]
+
+    clock.now += 0.6
+    report({"stage": "render", "pages_done": 3, "pages_total": 4})  # interval passed
+    assert len(writes) == 3
+
+    # A new stage is written even inside the interval
+    report({"stage": "extract", "pdf": 0, "pages_done": 1, "pages_total": 9})
+    assert len(writes) == 4
+    assert env.get("job-1")["stage"] == "extract"
@@ -0,0 +1,131 @@
+import io
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import app as app_module
+from app import app, etag_matches, parse_range
+from services.job_store import MemoryJobStore
+from services.storage_service import LocalStorage
+
+ETAG = '"abc123"'
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=10-", (10, 999)),
+    ("bytes=990-2000", (990, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("BYTES = 5-5", (5, 5)),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [
+    "bytes=--5",
+    "bytes=-",
+    "bytes=5-3",
+    "bytes=a-b",
+    "bytes=0-1,5-9",
+    "bytes=+1-2",
+    "bytes= 1 - 2",
+    "items=0-9",
+    "bytes",
+])
+def test_parse_range_ignores_malformed(header):
+    assert parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=1000-", 1000),
+    ("bytes=1000-1100", 1000),
+    ("bytes=-0", 1000),
+    ("bytes=-10", 0),
+])
+def test_parse_range_unsatisfiable(header, size):
+    with pytest.raises(HTTPException) as exc:
+        parse_range(header, size)
+    assert exc.value.status_code == 416
+    assert exc.value.headers["Content-Range"] == f"bytes */{size}"
+
+
+@pytest.mark.parametrize("header, expected", [
+    (ETAG, True),
+    ("*", True),
+    ('W/"abc123"', True),
+    ('"other", "abc123"', True),
+    ('"other"', False),
+    ('"abc"', False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, ETAG) is expected
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    storage = LocalStorage(tmp_path)
+    store = MemoryJobStore()
+    monkeypatch.setattr(app_module, "storage_service", storage)
+    monkeypatch.setattr(app_module, "job_store", store)
+
+    info = storage.put("job-1/file1.pdf", io.BytesIO(b"0123456789"))
+    store.create({
+        "job_id": "job-1",
+        "status": "completed",
+        "file1_key": "job-1/file1.pdf",
+        "file1_size": info["size"],
+        "file1_sha256": info["sha256"],
+    })
+    return TestClient(app), f'"{info["sha256"]}"'
+
+
+def test_full_download_has_etag_and_immutable_caching(client):
+    client, etag = client
+    response = client.get("/api/v1/jobs/job-1/files/file1")
+    assert response.status_code == 200
+    assert response.content == b"0123456789"
+    assert response.headers["etag"] == etag
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "immutable" in response.headers["cache-control"]
+
+
+def test_if_none_match_returns_304(client):
+    client, etag = client
+    response = client.get("/api/v1/jobs/job-1/files/file1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_range_returns_206(client):
+    client, _ = client
+    response = client.get("/api/v1/jobs/job-1/files/file1", headers={"Range": "bytes=2-4"})
+    assert response.status_code == 206
+    assert response.content == b"234"
+    assert response.headers["content-range"] == "bytes 2-4/10"
+    assert response.headers["content-length"] == "3"
+
+
+def test_unsatisfiable_range_returns_416(client):
+    client, _ = client
+    response = client.get("/api/v1/jobs/job-1/files/file1", headers={"Range": "bytes=10-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */10"
+
+
+def test_malformed_range_returns_full_object(client):
+    client, _ = client
+    response = client.get("/api/v1/jobs/job-1/files/file1", headers={"Range": "bytes=--5"})
+    assert response.status_code == 200
+    assert response.content == b"0123456789"
+
+
+def test_stale_if_range_returns_full_object(client):
+    client, _ = client
+    response = client.get("/api/v1/jobs/job-1/files/file1",
+                          headers={"Range": "bytes=2-4", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == b"0123456789"
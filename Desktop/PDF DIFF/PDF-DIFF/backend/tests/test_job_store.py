@@ -0,0 +1,168 @@
+import asyncio
+import threading
+
+import fakeredis
+import pytest
+import redis
+import redis.asyncio
+
+from services.job_store import MemoryJobStore, RedisJobStore
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request, monkeypatch):
+    if request.param == "memory":
+        return MemoryJobStore()
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.Redis, "from_url",
+                        lambda url, **kw: fakeredis.FakeRedis(server=server, **kw))
+    monkeypatch.setattr(redis.asyncio.Redis, "from_url",
+                        lambda url, **kw: fakeredis.FakeAsyncRedis(server=server, **kw))
+    return RedisJobStore("redis://fake", ttl_seconds=60)
+
+
+def make_job(job_id="job-1", status="pending"):
+    return {"job_id": job_id, "status": status, "created_at": "t0", "updated_at": "t0"}
+
+
+def test_create_rejects_duplicate_ids(store):
+    assert store.create(make_job())
+    assert not store.create(make_job(status="completed"))
+    assert store.get("job-1")["status"] == "pending"
+    assert [j["job_id"] for j in store.list()] == ["job-1"]
+
+
+def test_duplicate_create_keeps_index_order(store):
+    store.create(make_job("job-1"))
+    store.create(make_job("job-2"))
+    store.create(make_job("job-1"))
+    assert [j["job_id"] for j in store.list()] == ["job-1", "job-2"]
+
+
+def test_transition_from_allowed_status(store):
+    store.create(make_job())
+    job = store.transition("job-1", ("pending",), "processing", stage="extract")
+    assert job["status"] == "processing"
+    assert job["stage"] == "extract"
+    assert store.get("job-1")["stage"] == "extract"
+
+
+def test_transition_refused_from_other_status(store):
+    store.create(make_job(status="cancelled"))
+    assert store.transition("job-1", ("pending", "processing"), "completed") is None
+    assert store.get("job-1")["status"] == "cancelled"
+
+
+def test_transition_missing_job(store):
+    assert store.transition("missing", None, "failed") is None
+    assert store.update("missing", progress=0.5) is None
+
+
+def test_update_keeps_status(store):
+    store.create(make_job())
+    job = store.update("job-1", progress=0.5)
+    assert job["status"] == "pending"
+    assert job["progress"] == 0.5
+
+
+def test_concurrent_transitions_have_one_winner(store):
+    store.create(make_job())
+    results = []
+    barrier = threading.Barrier(8)
+
+    def worker(status):
+        barrier.wait()
+        results.append(store.transition("job-1", ("pending",), status))
+
+    threads = [threading.Thread(target=worker, args=(f"s{i}",)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    winners = [r for r in results if r is not None]
+    assert len(winners) == 1
+    assert store.get("job-1")["status"] == winners[0]["status"]
+
+
+def test_subscribe_receives_writes(store):
+    store.create(make_job())
+
+    async def run():
+        subscription = await store.subscribe("job-1")
+        try:
+            store.transition("job-1", ("pending",), "processing")
+            store.update("job-1", progress=0.5)
+            first = await subscription.get(timeout=1)
+            second = await subscription.get(timeout=1)
+            return first, second
+        finally:
+            await subscription.close()
+
+    first, second = asyncio.run(run())
+    assert first["status"] == "processing"
+    assert second["progress"] == 0.5
+
+
+def test_subscribe_ignores_refused_transitions_and_other_jobs(store):
+    store.create(make_job("job-1"))
+    store.create(make_job("job-2"))
+
+    async def run():
+        subscription = await store.subscribe("job-1")
+        try:
+            store.transition("job-1", ("completed",), "failed")
+            store.update("job-2", progress=0.5)
+            return await subscription.get(timeout=0.2)
+        finally:
+            await subscription.close()
+
+    assert asyncio.run(run()) is None
+
+
+def test_subscribers_of_one_job_all_receive_writes(store):
+    store.create(make_job())
+
+    async def run():
+        subscriptions = [await store.subscribe("job-1") for _ in range(3)]
+        store.update("job-1", progress=0.5)
+        updates = [await s.get(timeout=1) for s in subscriptions]
+        await subscriptions[0].close()
+        store.update("job-1", progress=0.6)
+        later = [await s.get(timeout=1) for s in subscriptions[1:]]
+        for s in subscriptions[1:]:
+            await s.close()
+        return updates, later
+
+    updates, later = asyncio.run(run())
+    assert [u["progress"] for u in updates] == [0.5, 0.5, 0.5]
+    assert [u["progress"] for u in later] == [0.6, 0.6]
+
+
+def test_redis_subscriptions_share_one_connection(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.Redis, "from_url",
+                        lambda url, **kw: fakeredis.FakeRedis(server=server, **kw))
+    monkeypatch.setattr(redis.asyncio.Redis, "from_url",
+                        lambda url, **kw: fakeredis.FakeAsyncRedis(server=server, **kw))
+    store = RedisJobStore("redis://fake", ttl_seconds=60)
+    for i in range(5):
+        store.create(make_job(f"job-{i}"))
+
+    async def run():
+        subscriptions = [await store.subscribe(f"job-{i}") for i in range(5)]
+        patterns = await store._async_redis.pubsub_numpat()
+        channels = await store._async_redis.pubsub_channels()
+        store.update("job-3", progress=0.5)
+        update = await subscriptions[3].get(timeout=1)
+        others = [await s.get(timeout=0.1) for i, s in enumerate(subscriptions) if i != 3]
+        for s in subscriptions:
+            await s.close()
+        return patterns, channels, update, others
+
+    patterns, channels, update, others = asyncio.run(run())
+    assert patterns == 1
+    assert channels == []
+    assert update["job_id"] == "job-3"
+    assert others == [None] * 4
@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from app import app
+from services.job_store import MemoryJobStore
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = MemoryJobStore()
+    monkeypatch.setattr(app_module, "job_store", store)
+    return store
+
+
+@pytest.fixture
+def client(store):
+    return TestClient(app)
+
+
+def make_job(job_id, status):
+    return {
+        "job_id": job_id,
+        "status": status,
+        "stage": status,
+        "created_at": "t0",
+        "updated_at": "t0",
+    }
+
+
+@pytest.mark.parametrize("status", ["pending", "processing"])
+def test_cancel_active_job(client, store, status):
+    store.create(make_job("job-1", status))
+
+    response = client.delete("/api/v1/jobs/job-1")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "cancelled"
+    job = store.get("job-1")
+    assert job["status"] == "cancelled"
+    assert job["error_message"] == "Cancelled by user"
+
+
+def test_cancel_unknown_job(client):
+    assert client.delete("/api/v1/jobs/missing").status_code == 404
+
+
+@pytest.mark.parametrize("status", ["completed", "failed", "cancelled"])
+def test_cancel_finished_job(client, store, status):
+    store.create(make_job("job-1", status))
+
+    response = client.delete("/api/v1/jobs/job-1")
+
+    assert response.status_code == 409
+    assert store.get("job-1")["status"] == status
+
+
+def read_events(response):
+    events = []
+    for line in response.iter_lines():
+        if line.startswith("data: "):
+            events.append(json.loads(line[len("data: "):]))
+    return events
+
+
+def when_subscribed(store, job_id, update):
+    # Apply `update` from another thread once the stream is listening.
+    def run():
+        deadline = time.monotonic() + 5
+        while job_id not in store._subscribers and time.monotonic() < deadline:
+            time.sleep(0.01)
+        update()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_events_unknown_job(client, store):
+    assert client.get("/api/v1/jobs/missing/events").status_code == 404
+    assert store._subscribers == {}
+
+
+@pytest.mark.parametrize("status", ["completed", "failed", "cancelled"])
+def test_events_for_finished_job_send_one_event_and_close(client, store, status):
+    store.create(make_job("job-1", status))
+
+    with client.stream("GET", "/api/v1/jobs/job-1/events") as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.headers["x-accel-buffering"] == "no"
+        events = read_events(response)
+
+    assert [e["status"] for e in events] == [status]
+    assert store._subscribers == {}
+
+
+@pytest.mark.parametrize("final_status", ["completed", "cancelled"])
+def test_events_stream_snapshot_then_updates_until_finished(client, store, final_status):
+    store.create(make_job("job-1", "processing"))
+
+    def update():
+        store.update("job-1", stage="render", progress=0.7)
+        store.transition("job-1", ("processing",), final_status, stage=final_status)
+
+    thread = when_subscribed(store, "job-1", update)
+    with client.stream("GET", "/api/v1/jobs/job-1/events") as response:
+        body = response.read().decode()
+    thread.join()
+
+    # Padding and the retry hint come before the first event
+    assert body.startswith(":" + " " * 2048)
+    assert body.index("retry: 3000") < body.index("event: status")
+    events = [json.loads(line[len("data: "):]) for line in body.splitlines() if line.startswith("data: ")]
+    assert [(e["status"], e["progress"]) for e in events] == [
+        ("processing", None),
+        ("processing", 0.7),
+        (final_status, 0.7),
+    ]
+    assert store._subscribers == {}
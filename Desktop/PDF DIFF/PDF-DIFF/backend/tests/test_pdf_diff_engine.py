@@ -0,0 +1,183 @@
+import subprocess
+import time
+
+import pytest
+
+import pdf_diff_engine
+
+PAGES = 25
+
+
+def fake_run_command(calls, page_count=PAGES):
+    def run_command(args, budget=None):
+        calls.append(args)
+        if args[0] == "pdfinfo":
+            return f"Title: x\nPages:          {page_count}\n".encode()
+        first, last = 1, page_count
+        if "-f" in args:
+            first, last = int(args[args.index("-f") + 1]), int(args[args.index("-l") + 1])
+        pages = "".join(
+            f'<page width="600" height="800"><word xMin="10" yMin="10" xMax="50" yMax="20">p{n}</word></page>'
+            for n in range(first, last + 1)
+        )
+        return f'<html xmlns="http://www.w3.org/1999/xhtml"><body><doc>{pages}</doc></body></html>'.encode()
+    return run_command
+
+
+def test_extraction_progress_is_reported_per_chunk(monkeypatch):
+    calls = []
+    events = []
+    monkeypatch.setattr(pdf_diff_engine, "run_command", fake_run_command(calls))
+
+    boxes = list(pdf_diff_engine.pdf_to_bboxes(0, "a.pdf", progress=events.append))
+
+    assert [b["page"]["number"] for b in boxes] == list(range(1, PAGES + 1))
+    assert [b["text"] for b in boxes][-1] == f"p{PAGES}"
+    assert calls == [
+        ["pdfinfo", "a.pdf"],
+        ["pdftotext", "-bbox", "-f", "1", "-l", "10", "a.pdf", "-"],
+        ["pdftotext", "-bbox", "-f", "11", "-l", "20", "a.pdf", "-"],
+        ["pdftotext", "-bbox", "-f", "21", "-l", "25", "a.pdf", "-"],
+    ]
+    assert [(e["pages_done"], e["pages_total"]) for e in events] == [(10, PAGES), (20, PAGES), (25, PAGES)]
+
+
+def test_extraction_runs_are_capped_for_long_documents(monkeypatch):
+    calls = []
+    events = []
+    monkeypatch.setattr(pdf_diff_engine, "run_command", fake_run_command(calls, page_count=1001))
+
+    boxes = list(pdf_diff_engine.pdf_to_bboxes(0, "a.pdf", progress=events.append))
+
+    assert len(boxes) == 1001
+    assert len(calls) == 1 + pdf_diff_engine.EXTRACT_MAX_RUNS
+    assert calls[1][2:6] == ["-f", "1", "-l", "101"]
+    assert events[-1]["pages_done"] == events[-1]["pages_total"] == 1001
+
+
+def test_extraction_without_progress_runs_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(pdf_diff_engine, "run_command", fake_run_command(calls))
+
+    boxes = list(pdf_diff_engine.pdf_to_bboxes(0, "a.pdf"))
+
+    assert calls == [["pdftotext", "-bbox", "a.pdf", "-"]]
+    assert [b["page"]["number"] for b in boxes] == list(range(1, PAGES + 1))
+
+
+def box(pdf, page, text, index=0):
+    return {
+        "index": index,
+        "pdf": {"index": pdf, "file": f"{pdf}.pdf"},
+        "page": {"number": page, "width": 600.0, "height": 800.0},
+        "x": 10.0, "y": 10.0, "width": 5.0, "height": 5.0,
+        "text": text,
+    }
+
+
+def test_page_diff_marks_changed_pages():
+    old = [box(0, 1, "same "), box(0, 2, "old "), box(0, 3, "tail ")]
+    new = [box(1, 1, "same "), box(1, 2, "new "), box(1, 3, "tail ")]
+
+    changes = pdf_diff_engine.perform_page_diff([old, new])
+
+    assert [(c["pdf"]["index"], c["page"]["number"]) for c in changes] == [(0, 2), (1, 2)]
+    assert changes[0]["width"] == 600.0 and changes[0]["height"] == 800.0
+
+
+def test_page_diff_separates_hunks_and_drops_trailing_separator():
+    old = [box(0, 1, "a "), box(0, 2, "b "), box(0, 3, "c "), box(0, 4, "d ")]
+    new = [box(1, 1, "x "), box(1, 2, "b "), box(1, 3, "y "), box(1, 4, "d ")]
+
+    changes = pdf_diff_engine.perform_page_diff([old, new])
+
+    pages = ["*" if c == "*" else (c["pdf"]["index"], c["page"]["number"]) for c in changes]
+    assert pages == [(0, 1), (1, 1), "*", (0, 3), (1, 3)]
+
+
+def test_page_diff_identical_documents():
+    doc = [box(0, 1, "same ")]
+    assert pdf_diff_engine.perform_page_diff([doc, [box(1, 1, "same ")]]) == []
+
+
+def test_perform_diff_flags_time_limited_diff(monkeypatch):
+    fast_diff_match_patch = pytest.importorskip("fast_diff_match_patch")
+
+    def slow_diff(a, b, timelimit, checklines):
+        time.sleep(timelimit)
+        return [("-", len(a)), ("+", len(b))]
+
+    monkeypatch.setattr(fast_diff_match_patch, "diff", slow_diff)
+    budget = pdf_diff_engine.Budget(deadline_at=time.time() + 0.4)
+
+    pdf_diff_engine.perform_diff("old", "new", budget)
+
+    assert budget.degraded == ["diff_time_limited"]
+
+
+def test_perform_diff_within_time_is_not_degraded():
+    pytest.importorskip("fast_diff_match_patch")
+    budget = pdf_diff_engine.Budget(deadline_at=time.time() + 60)
+
+    hunks = pdf_diff_engine.perform_diff("old text", "new text", budget)
+
+    assert hunks
+    assert budget.degraded == []
+
+
+def test_compute_changes_falls_back_to_page_diff(monkeypatch):
+    def run_command(args, budget=None):
+        word = "old" if args[-2] == "a.pdf" else "new"
+        return ('<html xmlns="http://www.w3.org/1999/xhtml"><body><doc>'
+                '<page width="600" height="800"><word xMin="1" yMin="1" xMax="9" yMax="9">same</word></page>'
+                f'<page width="600" height="800"><word xMin="1" yMin="1" xMax="9" yMax="9">{word}</word></page>'
+                '</doc></body></html>').encode()
+
+    monkeypatch.setattr(pdf_diff_engine, "run_command", run_command)
+    budget = pdf_diff_engine.Budget(deadline_at=time.time() + 2, min_diff_seconds=5)
+
+    changes = pdf_diff_engine.compute_changes("a.pdf", "b.pdf", budget=budget)
+
+    assert budget.degraded == ["page_level_diff"]
+    assert [(c["pdf"]["index"], c["page"]["number"]) for c in changes] == [(0, 2), (1, 2)]
+
+
+@pytest.fixture
+def spawned(monkeypatch):
+    procs = []
+    popen = subprocess.Popen
+
+    def record(*args, **kwargs):
+        proc = popen(*args, **kwargs)
+        procs.append(proc)
+        return proc
+
+    monkeypatch.setattr(subprocess, "Popen", record)
+    return procs
+
+
+def test_run_command_kills_child_on_cancel(spawned):
+    started = time.monotonic()
+    budget = pdf_diff_engine.Budget(is_cancelled=lambda: time.monotonic() - started > 0.3)
+
+    with pytest.raises(pdf_diff_engine.ComparisonCancelled):
+        pdf_diff_engine.run_command(["sleep", "5"], budget, poll_interval=0.1)
+
+    assert time.monotonic() - started < 2
+    assert spawned[0].poll() is not None
+
+
+def test_run_command_kills_child_on_deadline(spawned):
+    started = time.monotonic()
+    budget = pdf_diff_engine.Budget(deadline_at=time.time() + 0.3)
+
+    with pytest.raises(pdf_diff_engine.DeadlineExceeded):
+        pdf_diff_engine.run_command(["sleep", "5"], budget, poll_interval=0.1)
+
+    assert time.monotonic() - started < 2
+    assert spawned[0].poll() is not None
+
+
+def test_run_command_returns_output():
+    budget = pdf_diff_engine.Budget(deadline_at=time.time() + 10)
+    assert pdf_diff_engine.run_command(["echo", "hi"], budget) == b"hi\n"
@@ -0,0 +1,172 @@
+import hashlib
+import io
+
+import pytest
+
+from services.storage_service import LocalCache, LocalStorage, ObjectNotFound, S3Storage
+
+
+def test_local_storage_put_and_read_range(tmp_path):
+    storage = LocalStorage(tmp_path)
+    info = storage.put("job/file1.pdf", io.BytesIO(b"0123456789"))
+    assert info["size"] == 10
+    assert storage.size("job/file1.pdf") == 10
+    assert b"".join(storage.iter_bytes("job/file1.pdf", 2, 4)) == b"234"
+    with storage.local_file("job/file1.pdf") as path:
+        assert path.read_bytes() == b"0123456789"
+
+
+def test_local_storage_missing_object(tmp_path):
+    storage = LocalStorage(tmp_path)
+    with pytest.raises(ObjectNotFound):
+        storage.iter_bytes("job/missing.pdf")
+    with pytest.raises(ObjectNotFound):
+        with storage.local_file("job/missing.pdf"):
+            pass
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = LocalCache(tmp_path, max_bytes=10)
+    for name in ("a", "b", "c"):
+        src = tmp_path / f"src-{name}"
+        src.write_bytes(b"x" * 4)
+        cache.add(f"job/{name}", src)
+        src.unlink()
+    assert cache.open("job/a") is None
+    assert cache.open("job/c") is not None
+
+
+def test_cache_link_survives_eviction(tmp_path):
+    cache = LocalCache(tmp_path / "cache", max_bytes=12)
+    src = tmp_path / "src"
+    src.write_bytes(b"pdf-bytes")
+    cache.add("job/file1.pdf", src)
+
+    with cache.work_dir() as work_dir:
+        pinned = tmp_path / "cache" / work_dir / "file1.pdf"
+        assert cache.link("job/file1.pdf", pinned)
+        # A later, larger entry evicts the first one while it is in use
+        other = tmp_path / "other"
+        other.write_bytes(b"y" * 8)
+        cache.add("job/file2.pdf", other)
+        assert cache.open("job/file1.pdf") is None
+        assert pinned.read_bytes() == b"pdf-bytes"
+
+    assert not list((tmp_path / "cache").glob(".work-*"))
+
+
+BUCKET = "pdf-uploads"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    moto = pytest.importorskip("moto")
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"):
+        monkeypatch.setenv(name, "testing")
+    with moto.mock_aws():
+        yield
+
+
+def make_s3(cache_root=None):
+    cache = LocalCache(cache_root, max_bytes=1024 * 1024) if cache_root else None
+    return S3Storage(BUCKET, None, region="us-east-1", cache=cache)
+
+
+def test_s3_put_hashes_and_creates_bucket(s3):
+    storage = make_s3()
+    data = b"%PDF-1.4 hello"
+    info = storage.put("job/file1.pdf", io.BytesIO(data))
+    assert info == {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+    assert storage.size("job/file1.pdf") == len(data)
+
+
+def test_s3_multipart_put_hashes_every_part(s3):
+    storage = make_s3()
+    data = bytes(range(256)) * (9 * 4096)  # 9MB, above the multipart threshold
+    info = storage.put("job/big.pdf", io.BytesIO(data))
+    assert info == {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+    assert b"".join(storage.iter_bytes("job/big.pdf")) == data
+
+
+def test_s3_ranged_read_without_cache(s3):
+    storage = make_s3()
+    storage.put("job/file1.pdf", io.BytesIO(b"0123456789"))
+    assert b"".join(storage.iter_bytes("job/file1.pdf", 2, 4)) == b"234"
+    assert b"".join(storage.iter_bytes("job/file1.pdf", 7)) == b"789"
+
+
+def test_s3_full_read_fills_cache(s3, tmp_path):
+    storage = make_s3(tmp_path)
+    storage.put("job/file1.pdf", io.BytesIO(b"0123456789"))
+    assert b"".join(storage.iter_bytes("job/file1.pdf", chunk_size=3)) == b"0123456789"
+
+    # Served from the cache from now on, even if the object goes away
+    storage._client.delete_object(Bucket=BUCKET, Key="job/file1.pdf")
+    assert storage.size("job/file1.pdf") == 10
+    assert b"".join(storage.iter_bytes("job/file1.pdf", 2, 4)) == b"234"
+
+
+def test_s3_partial_read_is_not_cached(s3, tmp_path):
+    storage = make_s3(tmp_path)
+    storage.put("job/file1.pdf", io.BytesIO(b"0123456789"))
+    body = storage.iter_bytes("job/file1.pdf", chunk_size=3)
+    assert next(body) == b"012"
+    body.close()  # client disconnected mid-download
+
+    assert storage.cache.open("job/file1.pdf") is None
+    assert [p for p in tmp_path.rglob("*") if p.is_file()] == []
+
+
+def test_s3_local_file_miss_then_hit(s3, tmp_path):
+    storage = make_s3(tmp_path)
+    storage.put("job/file1.pdf", io.BytesIO(b"pdf-bytes"))
+
+    with storage.local_file("job/file1.pdf") as path:
+        assert path.read_bytes() == b"pdf-bytes"
+    assert not path.exists()
+
+    storage._client.delete_object(Bucket=BUCKET, Key="job/file1.pdf")
+    with storage.local_file("job/file1.pdf") as path:
+        assert path.read_bytes() == b"pdf-bytes"
+
+
+def test_s3_local_file_without_cache_cleans_up(s3):
+    storage = make_s3()
+    storage.put("job/file1.pdf", io.BytesIO(b"pdf-bytes"))
+    with storage.local_file("job/file1.pdf") as path:
+        assert path.read_bytes() == b"pdf-bytes"
+    assert not path.parent.exists()
+
+
+def test_s3_missing_object(s3, tmp_path):
+    storage = make_s3(tmp_path)
+    storage.put("job/file1.pdf", io.BytesIO(b"x"))
+    with pytest.raises(ObjectNotFound):
+        storage.size("job/missing.pdf")
+    with pytest.raises(ObjectNotFound):
+        storage.iter_bytes("job/missing.pdf")
+    with pytest.raises(ObjectNotFound):
+        with storage.local_file("job/missing.pdf"):
+            pass
+    assert not storage.exists("job/missing.pdf")
+
+
+def test_s3_delete_removes_object_and_cache_entry(s3, tmp_path):
+    storage = make_s3(tmp_path)
+    storage.put("job/file1.pdf", io.BytesIO(b"x"))
+    with storage.local_file("job/file1.pdf"):
+        pass
+    storage.delete("job/file1.pdf")
+    assert storage.cache.open("job/file1.pdf") is None
+    assert not storage.exists("job/file1.pdf")
+
+
+def test_s3_bucket_access_error_is_not_masked(s3):
+    from botocore.stub import Stubber
+
+    storage = make_s3()
+    with Stubber(storage._client) as stubber:
+        stubber.add_client_error("head_bucket", service_error_code="403", http_status_code=403)
+        with pytest.raises(storage._client_error):
+            storage.put("job/file1.pdf", io.BytesIO(b"x"))
+        stubber.assert_no_pending_responses()
@@ -5,12 +5,14 @@ import { PageNavigation } from '../components/PageNavigation';
 import { useJobPolling } from '../hooks/useJobPolling';
 import { Spinner } from '../components/Spinner';
 import { ErrorMessage } from '../components/ErrorMessage';
+import { cancelJob } from '../services/api';
 
 export function ResultsPage() {
   const { jobId } = useParams<{ jobId: string }>();
   const navigate = useNavigate();
   const { job, result, isPolling, pollError, loadJobFromUrl } = useJobPolling();
   const [loading, setLoading] = useState(true);
+  const [cancelling, setCancelling] = useState(false);
 
   useEffect(() => {
     if (!jobId) {
@@ -33,6 +35,18 @@ export function ResultsPage() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [jobId]);
 
+  const handleCancel = async () => {
+    if (!jobId) return;
+    try {
+      setCancelling(true);
+      // The status stream delivers the cancelled state and stops watching
+      await cancelJob(jobId);
+    } catch (error) {
+      console.error('Failed to cancel job:', error);
+      setCancelling(false);
+    }
+  };
+
   if (loading) {
     return (
       <div className="min-h-screen bg-gray-50 flex items-center justify-center">
@@ -69,13 +83,23 @@ export function ResultsPage() {
       <div className="min-h-screen bg-gray-50 flex items-center justify-center">
         <div className="text-center">
           <Spinner />
-          <p className="mt-4 text-gray-600">Processing your files...</p>
+          <p className="mt-4 text-gray-600">
+            Processing your files...
+            {job?.progress != null && ` ${Math.round(job.progress * 100)}%`}
+          </p>
+          <button
+            onClick={handleCancel}
+            disabled={cancelling}
+            className="mt-4 px-4 py-2 border border-gray-300 text-gray-700 rounded-lg hover:bg-gray-100 transition-colors disabled:opacity-50"
+          >
+            {cancelling ? 'Cancelling...' : 'Cancel'}
+          </button>
         </div>
       </div>
     );
   }
 
-  if (job.status === 'failed') {
+  if (job.status === 'failed' || job.status === 'cancelled') {
     return (
       <div className="min-h-screen bg-gray-50 p-6">
         <div className="max-w-2xl mx-auto">
@@ -0,0 +1,37 @@
+import { startPolling, stopPolling, type PollingCallbacks } from './pollingService';
+import { API_BASE_PATH, EVENTS_CONFIG } from '../utils/constants';
+import type { ComparisonJobStatusResponse } from '../types/api';
+let eventSource: EventSource | null = null;
+let firstEventTimer: ReturnType<typeof setTimeout> | null = null;
+function isTerminal(status: ComparisonJobStatusResponse): boolean { return status.status === 'completed' || status.status === 'failed' || status.status === 'cancelled'; }
+function closeEventSource(): void {
+  if (firstEventTimer) { clearTimeout(firstEventTimer); firstEventTimer = null; }
+  if (eventSource) { eventSource.close(); eventSource = null; }
+}
+/**
+ * Follow a job through the server-sent /events stream, falling back to
+ * polling when EventSource is unavailable, the stream errors before it ever
+ * delivered an event, or a buffering proxy holds the first event back.
+ */
+export function watchJob(jobId: string, callbacks: PollingCallbacks): void {
+  stopWatching();
+  if (typeof EventSource === 'undefined') { startPolling(jobId, callbacks); return; }
+  let received = false;
+  const fallBackToPolling = () => { closeEventSource(); startPolling(jobId, callbacks); };
+  const source = new EventSource(`${API_BASE_PATH}/jobs/${jobId}/events`);
+  eventSource = source;
+  firstEventTimer = setTimeout(() => { if (!received) fallBackToPolling(); }, EVENTS_CONFIG.firstEventTimeoutMs);
+  source.addEventListener('status', (event) => {
+    received = true;
+    const status = JSON.parse((event as MessageEvent<string>).data) as ComparisonJobStatusResponse;
+    callbacks.onStatusUpdate?.(status);
+    if (isTerminal(status)) {
+      closeEventSource();
+      callbacks.onComplete?.(status);
+    }
+  });
+  // EventSource reconnects by itself after a dropped stream; only give up on it
+  // if it never worked or the browser stopped retrying.
+  source.onerror = () => { if (eventSource === source && (!received || source.readyState === EventSource.CLOSED)) fallBackToPolling(); };
+}
+export function stopWatching(): void { closeEventSource(); stopPolling(); }
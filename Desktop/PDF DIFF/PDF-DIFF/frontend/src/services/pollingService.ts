@@ -17,7 +17,7 @@ export function startPolling(jobId: string, callbacks: PollingCallbacks): NodeJS
       const status = await getJobStatus(jobId);
       retryCount = 0;
       callbacks.onStatusUpdate?.(status);
-      if (status.status === 'completed' || status.status === 'failed') {
+      if (status.status === 'completed' || status.status === 'failed' || status.status === 'cancelled') {
         stopPolling();
         callbacks.onComplete?.(status);
       } else {
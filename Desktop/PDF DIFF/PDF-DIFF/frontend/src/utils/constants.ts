@@ -1,4 +1,6 @@
 export const API_BASE_PATH = '/api/v1';
 export const FILE_CONSTRAINTS = { maxSizeBytes: 50 * 1024 * 1024, maxSizeMB: 50, acceptedMimeTypes: ['application/pdf'], acceptedExtensions: ['.pdf'], } as const;
 export const DIFFERENCE_COLORS = { addition: '#22c55e', deletion: '#ef4444', modification: '#eab308', } as const;
+export const DEGRADED_NOTICES: Record<string, string> = { render_skipped: 'The comparison ran out of time before the result image could be rendered.', page_level_diff: 'The comparison ran short on time, so differences are only matched page by page.', diff_time_limited: 'The text diff was time-limited and may be less precise than usual.', };
+export const EVENTS_CONFIG = { firstEventTimeoutMs: 5000, } as const;
 export const POLLING_CONFIG = { initialIntervalMs: 3000, maxIntervalMs: 60000, exponentialBackoffMinutes: [5, 10], maxRetries: 3, timeoutMs: 30000, } as const;